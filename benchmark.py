@@ -0,0 +1,480 @@
+from collections import deque
+from sys import argv
+import json
+import os
+import random
+
+try:
+    from time import perf_counter
+except ImportError:
+    from time import ticks_us
+    def perf_counter() -> float:
+        return ticks_us() / 1_000_000
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import editor
+import hexeditor
+
+
+def legacy_format_hex_line(offset: int, data: bytes, bytes_per_line: int, max_offset: int) -> str:
+    """The per-byte f-string formatter that format_hex_line replaced;
+        kept here as the baseline for comparison.
+    """
+    line_data = data[:bytes_per_line]
+    hex_part = ' '.join([f'{b:02X}' for b in line_data])
+    hex_part = hex_part + ' ' * (bytes_per_line * 3 - 1 - len(hex_part))
+    ascii_part = ''.join([chr(b) if 32 <= b < 127 else '.' for b in line_data])
+    offset_str = hexeditor.pad_offset(offset, max_offset)
+    return f'[{offset_str}]: {hex_part} | {ascii_part}'
+
+def legacy_format_hex_display(data: bytes, start_byte: int, bytes_per_line: int, page_size: int) -> list[str]:
+    """The format_hex_display call as hexedit used to make it: the
+        whole buffer is copied with bytes() before each page is shown.
+    """
+    data = bytes(data)
+    lines = []
+    max_offset = len(data) - 1 if len(data) > 0 else 0
+    byte_offset = start_byte
+    for i in range(page_size):
+        if byte_offset >= len(data):
+            break
+        line_data = data[byte_offset:byte_offset + bytes_per_line]
+        lines.append(legacy_format_hex_line(byte_offset, line_data, bytes_per_line, max_offset))
+        byte_offset += bytes_per_line
+    return lines
+
+def legacy_write_file(fpath: str, lines: list[str]):
+    """The write_file that joined every line into one string and
+        truncated the file in place.
+    """
+    with open(fpath, 'w') as f:
+        f.write('\n'.join(lines))
+
+def legacy_write_binary_file(fpath: str, data: hexeditor.PieceTable):
+    """Writing a buffer the way hexedit used to: copied into one bytes
+        object and written over the file in place.
+    """
+    with open(fpath, 'wb') as f:
+        f.write(data.read(0, len(data)))
+
+def legacy_history(make_edit, count: int) -> tuple[deque, deque]:
+    """History's storage before edits were encoded into an EditStack:
+        a deque of edit tuples and a deque of their revisions.
+    """
+    applied = deque([], count + 1)
+    revisions = deque([], count + 1)
+    for i in range(count):
+        applied.append(make_edit(i))
+        revisions.append(i + 1)
+    return applied, revisions
+
+def rate(fn, *args, min_time: float = 0.5) -> float:
+    """Call fn(*args) repeatedly for at least min_time seconds and
+        return the number of calls per second.
+    """
+    calls = 0
+    start = perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        fn(*args)
+        calls += 1
+        elapsed = perf_counter() - start
+    return calls / elapsed
+
+def peak_memory(fn, *args) -> int|None:
+    """Call fn(*args) once and return the peak number of bytes it
+        allocated, or None if tracemalloc is not available.
+    """
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def retained_memory(fn, *args) -> int|None:
+    """Call fn(*args) once and return the number of bytes it allocated
+        that are still held while its result is kept, or None if
+        tracemalloc is not available.
+    """
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        result = fn(*args)
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+def bench_format_hex_line(bytes_per_line: int = 40) -> dict:
+    """Rows per second for formatting one row, before and after."""
+    data = os.urandom(bytes_per_line)
+    before = rate(legacy_format_hex_line, 0, data, bytes_per_line, 999999)
+    after = rate(hexeditor.format_hex_line, 0, memoryview(data), bytes_per_line, 999999)
+    return {'name': 'format_hex_line', 'unit': 'rows/s', 'before': before, 'after': after}
+
+def bench_format_hex_display(size: int = 1_000_000, bytes_per_line: int = 40, page_size: int = 35) -> dict:
+    """Rows per second for rendering one page from the middle of a
+        PieceTable holding a file of the given size, before and after.
+    """
+    data = hexeditor.PieceTable(os.urandom(size))
+    start = size // 2
+    before = rate(legacy_format_hex_display, data.read(0, size), start, bytes_per_line, page_size)
+    after = rate(hexeditor.format_hex_display, data, start, bytes_per_line, page_size)
+    return {
+        'name': f'format_hex_display ({size} bytes)',
+        'unit': 'rows/s',
+        'before': before * page_size,
+        'after': after * page_size,
+    }
+
+def bench_row_cache(size: int = 1_000_000, bytes_per_line: int = 40, page_size: int = 35) -> dict:
+    """Rows per second for paging back and forth between two pages of
+        unchanged data, without and with a RowCache.
+    """
+    data = hexeditor.PieceTable(os.urandom(size))
+    cache = hexeditor.RowCache()
+    page_bytes = bytes_per_line * page_size
+
+    def flip(cache: hexeditor.RowCache|None):
+        hexeditor.format_hex_display(data, 0, bytes_per_line, page_size, cache)
+        hexeditor.format_hex_display(data, page_bytes, bytes_per_line, page_size, cache)
+
+    before = rate(flip, None)
+    after = rate(flip, cache)
+    return {
+        'name': 'row_cache (n/p paging)',
+        'unit': 'rows/s',
+        'before': before * page_size * 2,
+        'after': after * page_size * 2,
+    }
+
+def bench_write_file(size: int = 1_000_000, fpath: str = 'benchmark.tmp') -> dict:
+    """Bytes per second and peak extra memory for saving a text file
+        of about the given size, before and after.
+    """
+    lines = [f'{i:08d},' + 'x' * 54 for i in range(size // 64)]
+    try:
+        result = {
+            'name': f'write_file ({size} bytes)',
+            'unit': 'bytes/s',
+            'before': rate(legacy_write_file, fpath, lines) * size,
+            'after': rate(editor.write_file, fpath, lines) * size,
+            'before_peak': peak_memory(legacy_write_file, fpath, lines),
+            'after_peak': peak_memory(editor.write_file, fpath, lines),
+        }
+    finally:
+        os.remove(fpath)
+    return result
+
+def bench_write_binary_file(size: int = 1_000_000, fpath: str = 'benchmark.tmp') -> dict:
+    """Bytes per second and peak extra memory for saving an edited
+        PieceTable of the given size, before and after.
+    """
+    data = hexeditor.PieceTable(os.urandom(size))
+    for i in range(1, 64):
+        data.insert(i * size // 64, b'edit')
+    try:
+        result = {
+            'name': f'write_binary_file ({size} bytes)',
+            'unit': 'bytes/s',
+            'before': rate(legacy_write_binary_file, fpath, data) * size,
+            'after': rate(hexeditor.write_binary_file, fpath, data) * size,
+            'before_peak': peak_memory(legacy_write_binary_file, fpath, data),
+            'after_peak': peak_memory(hexeditor.write_binary_file, fpath, data),
+        }
+    finally:
+        os.remove(fpath)
+    return result
+
+def text_edit(i: int) -> editor.Edit:
+    return editor.Edit('e', [i], f'old line {i:05d}', f'new line {i:05d}')
+
+def hex_edit(i: int) -> hexeditor.HexEdit:
+    return hexeditor.HexEdit('e', 4 * i, 4 * i + 4, i.to_bytes(4, 'big'), bytes(4))
+
+def compact_history(module, make_edit, count: int):
+    history = module.History(count, 1 << 24)
+    for i in range(count):
+        history.record(make_edit(i))
+    return history
+
+def bench_history(module, make_edit, edit_size, count: int = 100) -> dict:
+    """Bytes held per history entry beyond the edit content itself,
+        before and after, for count recorded edits. Needs tracemalloc.
+    """
+    content = sum([edit_size(make_edit(i)) for i in range(count)])
+    return {
+        'name': f'history ({count} {module.__name__} edits)',
+        'unit': 'bytes/entry',
+        'before': (retained_memory(legacy_history, make_edit, count) - content) / count,
+        'after': (retained_memory(compact_history, module, make_edit, count) - content) / count,
+        'before_peak': peak_memory(legacy_history, make_edit, count),
+        'after_peak': peak_memory(compact_history, module, make_edit, count),
+    }
+
+def source(name: str) -> str:
+    with open(f'{name}.py', 'r') as f:
+        return f.read()
+
+def load_module(name: str, text: str):
+    """Compile and run a module's source, as importing a .py file does
+        on MicroPython (CPython's import would use its cached bytecode).
+    """
+    exec(compile(text, f'{name}.py', 'exec'), {'__name__': name})
+
+# the modules that were split out of each editor, all of which it
+# compiled when it was imported before the split
+SPLIT_OUT = {
+    'editor': (
+        'editor_utils', 'editor_lazy', 'editor_journal', 'editor_profile', 'editor_search', 'editor_spill',
+    ),
+    'hexeditor': ('editor_reader', 'editor_journal', 'editor_profile', 'editor_spill'),
+}
+
+def bench_import(after: str, before: str = 'editor') -> dict:
+    """Imports per second and peak memory for loading the after module
+        alone, compared with loading the before module with the modules
+        that were split out of it compiled into it, as it was before.
+    """
+    before_text = '\n'.join([source(name) for name in (before,) + SPLIT_OUT[before]])
+    after_text = source(after)
+    return {
+        'name': f'import {after}',
+        'unit': 'imports/s',
+        'before': rate(load_module, before, before_text),
+        'after': rate(load_module, after, after_text),
+        'before_peak': peak_memory(load_module, before, before_text),
+        'after_peak': peak_memory(load_module, after, after_text),
+    }
+
+def parse_size(size: str) -> int:
+    """Parse a size such as 1000, 1K, 10M, or 1G into bytes."""
+    size = size.strip().upper()
+    scale = {'K': 1_000, 'M': 1_000_000, 'G': 1_000_000_000}.get(size[-1:], 1)
+    return int(size[:-1] if scale > 1 else size) * scale
+
+def make_text_file(fpath: str, size: int) -> int:
+    """Write a synthetic text file of about size bytes in 64-byte CSV
+        lines. Returns the number of lines.
+    """
+    count = max(size // 64, 1)
+    with open(fpath, 'w') as f:
+        for i in range(0, count, 1024):
+            f.write(''.join([f'{j:08d},' + 'x' * 54 + '\n' for j in range(i, min(i + 1024, count))]))
+    return count
+
+def make_binary_file(fpath: str, size: int, chunk_size: int = 65536):
+    """Write size random bytes to a file, one chunk at a time."""
+    with open(fpath, 'wb') as f:
+        for i in range(0, size, chunk_size):
+            f.write(os.urandom(min(chunk_size, size - i)))
+
+def render_text_page(lines: list[str], start: int, page_size: int = 42) -> list[str]:
+    """Format one page of lines the way edit does."""
+    stop = min(start + page_size, len(lines))
+    frame = []
+    for i in range(start, stop):
+        line = lines[i]
+        spaces = len(line) - len(line.lstrip())
+        line = ''.join([' ' if j % 4 else '_' for j in range(spaces)]) + line.lstrip()
+        frame.append(f"[{editor.pad_line_no(i, stop-1)}]: {line}")
+    return frame
+
+def text_scenario(fpath: str, lazy: bool, steps: int, measure):
+    """Open a text file in a Buffer, render a page, make steps random
+        inserts, deletes, and replaces, undo and redo steps edits, check
+        for unsaved edits, and save, passing each phase to measure.
+        Returns the history's bytes per entry beyond the edit content.
+    """
+    rng = random.Random(1)
+    buf = measure('open', editor.Buffer, fpath, lazy, 3 * steps, 1 << 24)
+    try:
+        measure('render', render_text_page, buf.lines, len(buf) // 2)
+
+        def edits(kind: str):
+            for _ in range(steps):
+                i = rng.randrange(len(buf))
+                if kind == 'insert':
+                    buf.insert(i, ['inserted line'])
+                elif kind == 'delete':
+                    buf.delete(i)
+                else:
+                    buf.replace(i, 'replaced line')
+
+        for kind in ('insert', 'delete', 'replace'):
+            measure(kind, edits, kind)
+        measure('undo', lambda: [buf.undo() for _ in range(steps)])
+        measure('redo', lambda: [buf.redo() for _ in range(steps)])
+        measure('dirty', lambda: [buf.is_dirty() for _ in range(steps)])
+        measure('save', buf.save)
+        return buf.history.entry_overhead()
+    finally:
+        buf.close()
+
+def binary_scenario(fpath: str, lazy: bool, steps: int, measure):
+    """Run the same phases as text_scenario on a HexBuffer, and return
+        the same history figure.
+    """
+    rng = random.Random(1)
+    buf = measure('open', hexeditor.HexBuffer, fpath, lazy, 3 * steps, 1 << 24)
+    try:
+        measure('render', hexeditor.format_hex_display, buf.data, len(buf) // 2, 40, 35)
+
+        def edits(kind: str):
+            for _ in range(steps):
+                i = rng.randrange(len(buf))
+                if kind == 'insert':
+                    buf.insert(i, b'\xde\xad\xbe\xef')
+                elif kind == 'delete':
+                    buf.delete(i, 4)
+                else:
+                    buf.replace(i, b'\xca\xfe')
+
+        for kind in ('insert', 'delete', 'replace'):
+            measure(kind, edits, kind)
+        measure('undo', lambda: [buf.undo() for _ in range(steps)])
+        measure('redo', lambda: [buf.redo() for _ in range(steps)])
+        measure('dirty', lambda: [buf.is_dirty() for _ in range(steps)])
+        measure('save', buf.save)
+        return buf.history.entry_overhead()
+    finally:
+        buf.close()
+
+def run_scenario(scenario, make_file, size: int, lazy: bool, steps: int,
+                 fpath: str = 'benchmark.tmp') -> dict:
+    """Run a scenario on a fresh synthetic file of the given size and
+        return the seconds each phase took and the history's bytes per
+        entry beyond the edit content. If tracemalloc is available,
+        the scenario is run a second time on a fresh file to record the
+        peak bytes each phase allocated without slowing the timed run.
+    """
+    phases = {}
+
+    def timed(name: str, fn, *args):
+        start = perf_counter()
+        result = fn(*args)
+        phases[name] = {'seconds': perf_counter() - start}
+        return result
+
+    def traced(name: str, fn, *args):
+        tracemalloc.start()
+        try:
+            result = fn(*args)
+            phases[name]['peak'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+
+    try:
+        make_file(fpath, size)
+        overhead = scenario(fpath, lazy, steps, timed)
+        if tracemalloc is not None:
+            make_file(fpath, size)
+            scenario(fpath, lazy, steps, traced)
+    finally:
+        for path in (fpath, f'{fpath}.tmp'):
+            if os.path.exists(path):
+                os.remove(path)
+    return {
+        'name': f"{scenario.__name__.split('_')[0]} ({size} bytes{', lazy' if lazy else ''})",
+        'size': size,
+        'lazy': lazy,
+        'steps': steps,
+        'phases': phases,
+        'history_overhead': overhead,
+    }
+
+def suite(sizes: list[int] = (1_000, 100_000, 1_000_000), steps: int = 100) -> list[dict]:
+    """Run the text and binary scenarios, eager and lazy, for each file
+        size and return the results.
+    """
+    results = []
+    for size in sizes:
+        for scenario, make_file in ((text_scenario, make_text_file), (binary_scenario, make_binary_file)):
+            for lazy in (False, True):
+                results.append(run_scenario(scenario, make_file, size, lazy, steps))
+    return results
+
+def print_suite(results: list[dict]):
+    for result in results:
+        phases = ', '.join([
+            f"{name} {phase['seconds'] * 1000:.2f} ms" +
+            (f" ({phase['peak']} B)" if 'peak' in phase else '')
+            for name, phase in result['phases'].items()
+        ])
+        print(f"{result['name']}: {phases}; history {result['history_overhead']} B/entry")
+
+benchmarks = {
+    'format_hex_line': bench_format_hex_line,
+    'format_hex_display': bench_format_hex_display,
+    'row_cache': bench_row_cache,
+    'write_file': bench_write_file,
+    'write_binary_file': bench_write_binary_file,
+    'import_editor': lambda: bench_import('editor'),
+    'import_hexeditor': lambda: bench_import('hexeditor', 'hexeditor'),
+    'import_editor_utils': lambda: bench_import('editor_utils'),
+    'history': lambda: bench_history(editor, text_edit, editor.Edit_size),
+    'hex_history': lambda: bench_history(hexeditor, hex_edit, hexeditor.HexEdit_size),
+}
+
+def run(names: list[str] = None, quiet: bool = False) -> list[dict]:
+    """Run the named benchmarks (or all of them) and print the results
+        unless quiet is True.
+    """
+    results = []
+    for name in names or benchmarks:
+        result = benchmarks[name]()
+        results.append(result)
+        if quiet:
+            continue
+        speedup = result['after'] / result['before']
+        line = f"{result['name']}: {result['before']:.0f} -> " + \
+            f"{result['after']:.0f} {result['unit']} ({speedup:.1f}x)"
+        if result.get('after_peak') is not None:
+            line = f"{line}; peak memory {result['before_peak']} -> {result['after_peak']} bytes"
+        print(line)
+    return results
+
+
+def usage():
+    print(f'Usage: {argv[0]} [{"|".join(benchmarks)} ...] [--json]')
+    print(f'       {argv[0]} suite [--sizes 1K,100K,1M] [--steps 100] [--json]')
+    print('       The suite times open, render, insert, delete, replace, undo, redo,')
+    print('       dirty check, and save on synthetic text and binary files, and reports')
+    print('       the bytes each history entry holds beyond its edit content')
+    print('       The --json flag prints the results as JSON for comparing commits')
+
+
+if __name__ == '__main__':
+    as_json = '--json' in argv
+    args = [a for a in argv[1:] if a != '--json']
+    if args[:1] == ['suite']:
+        options = {'--sizes': '1K,100K,1M', '--steps': '100'}
+        args = args[1:]
+        while len(args) > 1 and args[0] in options:
+            options[args[0]] = args[1]
+            args = args[2:]
+        if args:
+            usage()
+        else:
+            results = suite(
+                [parse_size(size) for size in options['--sizes'].split(',')],
+                int(options['--steps']),
+            )
+            if as_json:
+                print(json.dumps(results, indent=1))
+            else:
+                print_suite(results)
+    elif [a for a in args if a not in benchmarks]:
+        usage()
+    elif as_json:
+        print(json.dumps(run(args, quiet=True), indent=1))
+    else:
+        run(args)
@@ -1,10 +1,21 @@
 #!/bin/python
 
+from array import array
 from binascii import crc32
 from collections import deque, namedtuple
 from sys import argv
+from time import time
+import sys
 import os
 
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    def ticks_ms() -> int:
+        return int(time() * 1000)
+    def ticks_diff(end: int, start: int) -> int:
+        return end - start
+
 
 """
 ISC License
@@ -27,95 +38,575 @@ CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
 """
 
 
+# For 'e' edits, old_line and new_line are single lines; for 'd', 'i',
+# and 'a' edits, they are lists of the lines deleted or inserted, so a
+# multi-line command is recorded (and undone/redone) as a single edit.
+# For 's' (substitute) edits, args holds the index of every changed line
+# and old_line and new_line hold those lines before and after.
 Edit = namedtuple('Edit', ['command', 'args', 'old_line', 'new_line'])
 
 def Edit_to_bytes(edit: Edit) -> bytes:
     val = edit.command.encode()
-    val = val + len(edit.args).to_bytes(1, 'big')
+    val = val + len(edit.args).to_bytes(4, 'big')
     for arg in edit.args:
-        val = val + arg.to_bytes(2, 'big')
-    if edit.old_line:
-        val = val + edit.old_line.encode()
-    if edit.new_line:
-        val = val + edit.new_line.encode()
+        val = val + arg.to_bytes(4, 'big')
+    for lines in (edit.old_line, edit.new_line):
+        if lines is None:
+            # None is distinguished from an empty line by the length
+            val = val + b'\\xff\\xff\\xff\\xff'
+        else:
+            lines = (lines if type(lines) is str else '\\n'.join(lines)).encode()
+            val = val + len(lines).to_bytes(4, 'big') + lines
     return val
 
+def Edit_from_bytes(data: bytes) -> Edit:
+    """Parse the output of Edit_to_bytes back into an Edit."""
+    command = chr(data[0])
+    nargs = int.from_bytes(data[1:5], 'big')
+    args = [int.from_bytes(data[5+4*i:9+4*i], 'big') for i in range(nargs)]
+    i = 5 + 4 * nargs
+    lines = []
+    for _ in range(2):
+        size = int.from_bytes(data[i:i+4], 'big')
+        i += 4
+        if size == 0xFFFFFFFF:
+            lines.append(None)
+            continue
+        line = bytes(data[i:i+size]).decode()
+        lines.append(line if command == 'e' else line.split('\\n'))
+        i += size
+    return Edit(command, args, lines[0], lines[1])
+
+def Edit_size(edit: Edit) -> int:
+    """Returns the length of the content stored in an edit."""
+    size = 4 * len(edit.args)
+    for lines in (edit.old_line, edit.new_line):
+        if type(lines) is str:
+            size += len(lines)
+        elif lines:
+            for line in lines:
+                size += len(line) + 1
+    return size
+
 
-def cat(fname: str) -> str:
-    """Returns the str contents of a file. Intended to be used with
-        `print` or another utility function from this library.
+class EditStack:
+    """A stack of encoded edits that can also be trimmed from the
+        bottom. The records are stored back to back in one bytearray
+        arena, with the start, content size, and revisions of each in
+        parallel arrays, so an entry costs one record and four array
+        slots instead of an edit tuple and its separate objects. Entries
+        head to count are in use; the arena and arrays are compacted
+        once at least half of them have been trimmed from the bottom.
     """
-    with open(fname, 'r') as f:
-        return f.read()
-
-def to_lines(data: str) -> list[str]:
-    return data.split('\\n')
-
-def from_lines(data: list[str]) -> str:
-    return '\\n'.join(data)
-
-def number_lines(data: str|list[str]) -> str:
-    """Prepends each line with its line number."""
-    data = to_lines(data) if type(data) is str else data
-    max_i = len(data)
-    for i in range(len(data)):
-        data[i] = f'[{pad_line_no(i, max_i)}]: {data[i]}'
-    return from_lines(data)
-
-def page(data: str|list[str], index: int = 0, offset: int = 0, size: int = 46, linenos: bool = False) -> str:
-    """Given file contents, return a specific page. If linenos=True,
-        each line will have its line number prepended. Intended to be
-        used with `print` on output from `cat`.
+    __slots__ = ('arena', 'starts', 'sizes', 'revisions', 'belows', 'head', 'count')
+
+    def __init__(self):
+        self.arena = bytearray()
+        self.starts = array('I')
+        self.sizes = array('I')
+        self.revisions = array('I')
+        # the revision below each undone edit; unused by the applied stack
+        self.belows = array('I')
+        self.head = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count - self.head
+
+    def revision(self) -> int:
+        """Returns the revision of the top entry."""
+        return self.revisions[self.count-1]
+
+    def footprint(self) -> int:
+        """Returns the bytes held by the arena and the arrays."""
+        return len(self.arena) + 16 * len(self.starts)
+
+    def push(self, record: bytes, size: int, revision: int, below: int = 0):
+        i = self.count
+        if i < len(self.starts):
+            self.starts[i] = len(self.arena)
+            self.sizes[i] = size
+            self.revisions[i] = revision
+            self.belows[i] = below
+        else:
+            self.starts.append(len(self.arena))
+            self.sizes.append(size)
+            self.revisions.append(revision)
+            self.belows.append(below)
+        self.arena.extend(record)
+        self.count += 1
+
+    def top(self) -> bytearray:
+        """Returns a copy of the top record."""
+        return self.arena[self.starts[self.count-1]:]
+
+    def bottom(self) -> bytearray:
+        """Returns a copy of the bottom record."""
+        i = self.head
+        return self.arena[self.starts[i]:self.starts[i+1] if i + 1 < self.count else len(self.arena)]
+
+    def pop(self) -> tuple[int, int, int]:
+        """Remove the top entry and return its content size, revision,
+            and revision below.
+        """
+        self.count -= 1
+        i = self.count
+        self.arena[self.starts[i]:] = b''
+        if self.count == self.head:
+            self._clear()
+        return self.sizes[i], self.revisions[i], self.belows[i]
+
+    def popleft(self) -> tuple[int, int, int]:
+        """Remove the bottom entry and return its content size,
+            revision, and revision below.
+        """
+        i = self.head
+        self.head += 1
+        entry = self.sizes[i], self.revisions[i], self.belows[i]
+        if self.head == self.count:
+            self._clear()
+        elif 2 * self.head >= self.count:
+            self._compact()
+        return entry
+
+    def _clear(self):
+        # a new arena, as shrinking one may keep its allocation
+        self.arena = bytearray()
+        self.head = self.count = 0
+
+    def _compact(self):
+        """Move the entries in use to the front of the arena and arrays."""
+        head = self.head
+        shift = self.starts[head]
+        self.arena[:shift] = b''
+        for i in range(head, self.count):
+            self.starts[i-head] = self.starts[i] - shift
+            self.sizes[i-head] = self.sizes[i]
+            self.revisions[i-head] = self.revisions[i]
+            self.belows[i-head] = self.belows[i]
+        self.count -= head
+        self.head = 0
+
+
+class History:
+    """Applied and undone edit stacks with O(1) unsaved edit tracking.
+        Every state of the applied stack gets its own revision number,
+        and the revision at the last write is remembered, so checking
+        for unsaved edits is a single comparison. Undoing back to the
+        written state counts as clean, as does redoing back to it.
+
+        The history is bounded by both an entry count (size) and the
+        total bytes of old and new content stored in its edits
+        (max_bytes). When a limit is exceeded, the oldest applied edits
+        are dropped, or, if spill_path is set, appended to a spill file
+        and paged back in when undo reaches them; undone edits are
+        dropped if the applied edits alone cannot be trimmed enough. An
+        edit too large for max_bytes on its own is spilled as well, or,
+        without spill_path, dropped at once and counted in unrecorded,
+        since it cannot be undone. Call close() to delete the spill file.
+
+        Edits are stored encoded in an EditStack for each direction and
+        are only parsed back into Edit objects when popped to be undone
+        or redone.
     """
-    data = to_lines(data) if type(data) is str else data
+    __slots__ = ('size', 'applied', 'undone', 'next_revision', 'base_revision', 'saved_revision', 'popped',
+                 'max_bytes', 'bytes', 'spill_path', 'spill', 'unrecorded')
+
+    def __init__(self, size: int = 100, max_bytes: int = 16384, spill_path: str = None):
+        self.size = size
+        # each applied edit is stored with the revision after it, and
+        # each undone edit with that revision and the one below it
+        self.applied = EditStack()
+        self.undone = EditStack()
+        self.next_revision = 1
+        self.base_revision = 0
+        self.saved_revision = 0
+        self.popped = None
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.spill_path = spill_path
+        # the Spill from editor_spill, imported on the first spill
+        self.spill = None
+        self.unrecorded = 0
+
+    def revision(self) -> int:
+        """Returns the revision of the current state."""
+        return self.applied.revision() if len(self.applied) else self.base_revision
+
+    def _push(self, ed: Edit, revision: int) -> bytes:
+        record = Edit_to_bytes(ed)
+        size = Edit_size(ed)
+        self.applied.push(record, size, revision)
+        self.bytes += size
+        self._trim()
+        return record
+
+    def _spilled(self) -> int:
+        return len(self.spill) if self.spill is not None else 0
+
+    def _trim(self):
+        """Drop or spill the oldest edits until both limits are met."""
+        while len(self.applied) > self.size or (self.bytes > self.max_bytes and len(self.applied) > 1):
+            self._drop_oldest()
+        while len(self.undone) and (len(self.undone) > self.size or self.bytes > self.max_bytes):
+            self.bytes -= self.undone.popleft()[0]
+        if self.bytes > self.max_bytes and len(self.applied):
+            # the newest edit alone is over the limit
+            if not self.spill_path:
+                self.unrecorded += 1
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        """Drop the oldest applied edit, or move it to the spill file."""
+        record = self.applied.bottom() if self.spill_path else None
+        size, self.base_revision, _ = self.applied.popleft()
+        self.bytes -= size
+        if record is not None:
+            self._spill_out(record, size, self.base_revision)
+
+    def _spill_out(self, record: bytes, size: int, revision: int):
+        if self.spill is None:
+            from editor_spill import Spill
+            self.spill = Spill(self.spill_path)
+        self.spill.push(record, size, revision)
+
+    def _spill_in(self):
+        """Page the most recently spilled edit back into the applied
+            stack, which is empty when undo reaches the spill file.
+        """
+        record, size, revision = self.spill.pop()
+        self.applied.push(record, size, revision)
+        self.bytes += size
+        self.base_revision = self.spill.revision()
+
+    def record(self, ed: Edit) -> bytes:
+        """Record a newly applied edit. Returns its encoding, as written
+            by Edit_to_bytes.
+        """
+        record = self._push(ed, self.next_revision)
+        self.next_revision += 1
+        return record
+
+    def pop_applied(self) -> Edit|None:
+        """Pop the last applied edit in order to undo it. Call
+            push_undone once it has been undone.
+        """
+        if not len(self.applied) and self._spilled():
+            self._spill_in()
+        if not len(self.applied):
+            return None
+        ed = Edit_from_bytes(self.applied.top())
+        size, self.popped, _ = self.applied.pop()
+        self.bytes -= size
+        return ed
+
+    def push_undone(self, ed: Edit):
+        size = Edit_size(ed)
+        self.undone.push(Edit_to_bytes(ed), size, self.popped, self.revision())
+        self.bytes += size
+        self._trim()
+
+    def pop_undone(self) -> Edit|None:
+        """Pop the last undone edit in order to redo it. Call
+            push_redone once it has been redone.
+        """
+        if not len(self.undone):
+            return None
+        ed = Edit_from_bytes(self.undone.top())
+        size, revision, below = self.undone.pop()
+        self.popped = (revision, below)
+        self.bytes -= size
+        return ed
+
+    def push_redone(self, ed: Edit):
+        revision, below = self.popped
+        if below != self.revision():
+            # redone on top of different edits, so this is a new state
+            revision = self.next_revision
+            self.next_revision += 1
+        self._push(ed, revision)
+
+    def top_record(self, undone: bool = False) -> bytearray|None:
+        """Returns the encoding of the edit that pop_applied (or, if
+            undone is True, pop_undone) would return next, or None.
+        """
+        if undone:
+            return self.undone.top() if len(self.undone) else None
+        if not len(self.applied) and self._spilled():
+            self._spill_in()
+        return self.applied.top() if len(self.applied) else None
+
+    def mark_saved(self):
+        """Mark the current state as written to the file."""
+        self.saved_revision = self.revision()
+
+    def is_dirty(self) -> bool:
+        """Returns True if the current state has not been written."""
+        return self.revision() != self.saved_revision
+
+    def entry_overhead(self) -> int:
+        """Returns the bytes the stacks hold per entry beyond the edit
+            content itself, or 0 if there are no entries.
+        """
+        entries = len(self.applied) + len(self.undone)
+        if not entries:
+            return 0
+        return (self.applied.footprint() + self.undone.footprint() - self.bytes) // entries
+
+    def status(self) -> str:
+        """Returns a summary of the history's size for the status line."""
+        status = f'History: {len(self.applied)} applied, {len(self.undone)} undone, ' + \\
+            f'{self.bytes}/{self.max_bytes} bytes'
+        if self._spilled():
+            status = f'{status}, {self._spilled()} spilled'
+        return status
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
 
-    if index * size + offset < len(data):
-        if len(data) > size * (index + 1) + offset:
-            data = data[size*index+offset:size*(index+1)+offset]
+
+class Screen:
+    """Terminal renderer. With ansi=True, it keeps the previously drawn
+        frame and uses ANSI cursor addressing to redraw only the lines
+        that changed; line wrapping is disabled while drawing, so each
+        line of a frame occupies exactly one row. With ansi=False, it
+        clears the screen and prints the whole frame every time. Either
+        way, each redraw is composed in memory and sent to the terminal
+        with a single write. If count_bytes=True, the number of bytes
+        sent by the last redraw is kept in last_bytes.
+
+        Rows past the bottom of the terminal cannot be addressed, so a
+        frame that does not fit above the prompt is printed in full and
+        left to scroll instead. The height is rows, if set, or else the
+        terminal's size where os.get_terminal_size can tell it (not on
+        MicroPython, where an unknown height is assumed to fit).
+    """
+    __slots__ = ('ansi', 'frame', 'count_bytes', 'last_bytes', 'total_bytes', 'rows')
+
+    def __init__(self, ansi: bool = True, count_bytes: bool = False, rows: int = None):
+        self.ansi = ansi
+        self.frame = None
+        self.rows = rows
+        self.count_bytes = count_bytes
+        self.last_bytes = 0
+        self.total_bytes = 0
+
+    def invalidate(self):
+        """Force the next draw to redraw the whole frame."""
+        self.frame = None
+
+    def height(self) -> int|None:
+        """Returns the terminal height, or None if it is unknown."""
+        if self.rows:
+            return self.rows
+        if hasattr(os, 'get_terminal_size'):
+            try:
+                return os.get_terminal_size().lines
+            except OSError:
+                ...
+        return None
+
+    def draw(self, lines: list[str]):
+        buf = []
+        rows = self.height() if self.ansi else None
+        if rows and len(lines) + 2 > rows:
+            # the frame, the prompt, and the line typed at it would run
+            # past the bottom row, which cursor addressing cannot reach
+            buf.append('\\x1b[2J\\x1b[H')
+            buf.append('\\n'.join(lines))
+            buf.append('\\n')
+            self.frame = None
+        elif not self.ansi:
+            if hasattr(os, 'system') and hasattr(os, 'name'):
+                try:
+                    os.system('cls' if os.name == 'nt' else 'clear')
+                except:
+                    ...
+            buf.append('\\n'.join(lines))
+            buf.append('\\n')
         else:
-            data = data[size*index+offset:]
-    elif size + offset < len(data):
-        data = data[offset:offset+size]
-    elif size < len(data):
-        data = data = data[:size]
-
-    if linenos:
-        max_i = len(data)
-        for i in range(len(data)):
-            data[i] = f'[{pad_line_no(i, max_i)}]: {data[i]}'
-    return from_lines(data)
-
-def grep(data: str|list[str], search: str|list[str]) -> str:
-    """Searches the given data for the search term[s]. Returns all
-        matched lines; each matching line will be prepended with its
-        line number. Intended to be used with `print` on output from
-        `cat`.
+            buf.append('\\x1b[?7l')
+            if self.frame is None:
+                buf.append('\\x1b[2J')
+                self.frame = []
+            for row in range(len(lines)):
+                if row >= len(self.frame) or self.frame[row] != lines[row]:
+                    buf.append(f'\\x1b[{row+1};1H{lines[row]}\\x1b[K')
+            # clear the old prompt, typed input, and any rows left over
+            # from a longer previous frame
+            buf.append(f'\\x1b[{len(lines)+1};1H\\x1b[J\\x1b[?7h')
+            self.frame = lines
+
+        text = ''.join(buf)
+        sys.stdout.write(text)
+        if hasattr(sys.stdout, 'flush'):
+            sys.stdout.flush()
+        if self.count_bytes:
+            self.last_bytes = len(text.encode())
+            self.total_bytes += self.last_bytes
+
+
+def sync_file(f):
+    """Flush a file and make sure its contents have reached storage."""
+    f.flush()
+    if hasattr(os, 'fsync'):
+        os.fsync(f.fileno())
+    elif hasattr(os, 'sync'):
+        os.sync()
+
+def replace_file(src: str, dst: str):
+    """Rename src over dst. os.rename cannot overwrite an existing file
+        on Windows, so os.replace is used where it exists; MicroPython
+        only has os.rename, which overwrites.
+    """
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        os.rename(src, dst)
+
+def file_size(fpath: str) -> int:
+    try:
+        return os.stat(fpath)[6]
+    except OSError:
+        return 0
+
+def file_crc(fpath: str, chunk_size: int = 1024) -> int:
+    """Returns the CRC32 of a file's contents, read in chunks of
+        chunk_size bytes, or 0 if it cannot be read.
     """
-    data = to_lines(data) if type(data) is str else data
-    matches = []
-    max_i = len(data) - 1
-
-    for i, line in enumerate(data):
-        if type(search) is str and search in line:
-            matches.append(f'{pad_line_no(i, max_i)}: {line}')
-        elif type(search) is list:
-            for s in search:
-                if s in line:
-                    matches.append(f'{pad_line_no(i, max_i)}: {line}')
+    crc = 0
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    try:
+        with open(fpath, 'rb') as f:
+            while True:
+                n = f.readinto(buffer)
+                if not n:
                     break
+                crc = crc32(view[:n], crc)
+    except OSError:
+        ...
+    return crc
+
 
-    return from_lines(matches)
+# the module each optional part of the editor lives in
+_LAZY = {
+    'cat': 'editor_utils', 'to_lines': 'editor_utils', 'from_lines': 'editor_utils',
+    'number_lines': 'editor_utils', 'page': 'editor_utils', 'grep': 'editor_utils',
+    'LazyLines': 'editor_lazy', 'Journal': 'editor_journal', 'read_journal': 'editor_journal',
+    'Profiler': 'editor_profile', 'LineSearch': 'editor_search',
+    'parse_substitute': 'editor_search', 'substitute': 'editor_search', 'Spill': 'editor_spill',
+}
+
+def __getattr__(name: str):
+    """Import the REPL helpers and the optional parts of the editor
+        (lazy loading, the journal, the profiler, search, and the
+        history spill file) from their modules on first use, so that
+        importing the editor does not compile them.
+    """
+    if name in _LAZY:
+        return getattr(__import__(_LAZY[name]), name)
+    raise AttributeError(f"module 'editor' has no attribute '{name}'")
 
 def read_file(fpath: str) -> list[str]:
+    """Read a file as a list of lines without their line endings."""
     try:
         with open(fpath, 'r') as f:
-            return f.read().split('\\n')
+            text = f.read()
     except:
         return []
+    lines = text.split('\\n')
+    if '\\r' in text:
+        # MicroPython does not translate CRLF line endings when reading
+        lines = [line[:-1] if line[-1:] == '\\r' else line for line in lines]
+    return lines
+
+def line_ending(fpath: str) -> str:
+    """Returns the line ending of the first line of a file: CRLF or,
+        for LF or a file without line endings, LF.
+    """
+    try:
+        with open(fpath, 'rb') as f:
+            last = b''
+            while True:
+                chunk = f.read(1024)
+                if not chunk:
+                    break
+                i = chunk.find(b'\\n')
+                if i >= 0:
+                    return '\\r\\n' if (chunk[i-1:i] if i else last) == b'\\r' else '\\n'
+                last = chunk[-1:]
+    except OSError:
+        ...
+    return '\\n'
 
-def write_file(fpath: str, lines: list[str]):
-    with open(fpath, 'w') as f:
-        f.write('\\n'.join(lines))
+def open_lines(fpath: str, lazy: bool = False) -> list[str]:
+    """Open a file as a list of lines. If lazy=True, returns a
+        LazyLines (from editor_lazy) that reads lines from the file on
+        demand instead.
+    """
+    if lazy:
+        try:
+            from editor_lazy import LazyLines
+            return LazyLines(fpath)
+        except OSError:
+            ...
+    return read_file(fpath)
+
+# the size of the buffer a save writes through, which bounds the memory
+# it needs beyond the edited data
+WRITE_CHUNK_SIZE = 4096
+
+def write_file(fpath: str, lines: list[str], chunk_size: int = WRITE_CHUNK_SIZE,
+               replace: bool = True, newline: str = '\\n') -> int:
+    """Write lines to a file without joining them in memory, separated
+        by newline (see line_ending). Lines are encoded into a fixed
+        buffer of chunk_size bytes that is written to a temporary file
+        each time it fills; the temporary file is then synced and
+        renamed over fpath, so a reset during the write leaves the
+        original file intact. If replace is False, the
+        synced temporary file is left at fpath + '.tmp' for the caller
+        to replace fpath with, e.g. once LazyLines reading fpath have
+        been closed. Returns the number of bytes written.
+    """
+    tmp_path = f'{fpath}.tmp'
+    buffer = bytearray(chunk_size)
+    used = 0
+    written = 0
+
+    def put(data: bytes):
+        nonlocal used, written
+        if used + len(data) < chunk_size:
+            buffer[used:used+len(data)] = data
+            used += len(data)
+            return
+        view = memoryview(data)
+        while len(view):
+            n = min(len(view), chunk_size - used)
+            buffer[used:used+n] = view[:n]
+            used += n
+            view = view[n:]
+            if used == chunk_size:
+                f.write(buffer)
+                written += used
+                used = 0
+
+    separator = newline.encode()
+    with open(tmp_path, 'wb') as f:
+        first = True
+        for line in lines:
+            if not first:
+                put(separator)
+            put(line.encode())
+            first = False
+        f.write(memoryview(buffer)[:used])
+        written += used
+        sync_file(f)
+    if replace:
+        replace_file(tmp_path, fpath)
+    return written
 
 def pad_line_no(i: int, max_i: int) -> str:
     i = str(i)
@@ -135,196 +626,665 @@ def checksum(edit_buffer: deque[Edit] = None, lines: list[str] = None) -> int:
             val = crc32(lines[i].encode(), val)
     return val
 
-def edit(fpath: str, page_size: int = 42, history_buffer_size: int = 100):
-    """Edit a file. This is the main function for this library."""
-    applied_edits: deque[Edit] = deque([], history_buffer_size)
-    undone_edits: deque[Edit] = deque([], history_buffer_size)
-    original_page_size = page_size
+class Buffer:
+    """Headless editing engine for a text file: the lines, the edit
+        history, and the optional journal, with a method for each
+        editing command. edit() is an interactive front-end for it, and
+        it can also be driven directly from code. Line indices start at
+        0, and invalid indices raise ValueError. See edit for the
+        parameters.
+    """
+    __slots__ = ('fpath', 'lazy', 'lines', 'newline', 'history', 'log', 'search')
 
-    def undo():
-        if not len(applied_edits):
-            return
-        ed = applied_edits.pop()
+    def __init__(self, fpath: str, lazy: bool = False, history_buffer_size: int = 100,
+                 history_buffer_bytes: int = 16384, history_spill_path: str = None, journal: bool = False,
+                 journal_flush_records: int = 8, journal_flush_interval: int = 5):
+        self.fpath = fpath
+        self.lazy = lazy
+        self.lines = open_lines(fpath, lazy)
+        # lines are held without their line endings and written with this
+        self.newline = line_ending(fpath)
+        self.history = History(history_buffer_size, history_buffer_bytes, history_spill_path)
+        self.log = None
+        if journal:
+            from editor_journal import Journal
+            self.log = Journal(f'{fpath}.journal', journal_flush_records, journal_flush_interval)
+        # the LineSearch from editor_search, created by the first search
+        self.search = None
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def apply(self, ed: Edit):
+        """Apply a new edit to the lines and record it."""
+        lines = self.lines
+        if ed.command == 'e':
+            lines[ed.args[0]] = ed.new_line
+        elif ed.command == 'd':
+            del lines[ed.args[0]:ed.args[0]+len(ed.old_line)]
+        elif ed.command == 'i':
+            lines[ed.args[0]:ed.args[0]] = ed.new_line
+        elif ed.command == 'a':
+            lines.extend(ed.new_line)
+        elif ed.command == 's':
+            for i, line in zip(ed.args, ed.new_line):
+                lines[i] = line
+        record = self.history.record(ed)
+        if self.log:
+            self.log.write('A', record)
+
+    def _check(self, index: int):
+        if index < 0 or index >= len(self.lines):
+            raise ValueError(f'Line index {index} is beyond end of file (length: {len(self.lines)})')
+
+    def replace(self, index: int, line: str):
+        self._check(index)
+        self.apply(Edit('e', [index], self.lines[index], line))
+
+    def delete(self, index: int, count: int = 1):
+        self._check(index)
+        old_lines = self.lines[index:index+count]
+        if old_lines:
+            self.apply(Edit('d', [index], old_lines, None))
+
+    def insert(self, index: int, new_lines: list[str]):
+        """Insert lines before index; an index past the end appends."""
+        if new_lines:
+            self.apply(Edit('i', [min(max(index, 0), len(self.lines))], None, list(new_lines)))
+
+    def append(self, new_lines: list[str]):
+        if new_lines:
+            self.apply(Edit('a', [], None, list(new_lines)))
+
+    def substitute(self, first: int, last: int, old: str, new: str, regex: bool = False) -> int:
+        """Replace old with new in lines first through last as a single
+            edit; see substitute. Returns the number of changed lines.
+        """
+        from editor_search import substitute
+        changes = substitute(self.lines, first, last, old, new, regex)
+        if changes is None:
+            return 0
+        self.apply(Edit('s', *changes))
+        return len(changes[0])
+
+    def _inverse(self, ed: Edit) -> Edit:
+        """Returns the edit that reverts ed when applied."""
+        if ed.command == 'd':
+            return Edit('i', ed.args, None, ed.old_line)
+        if ed.command == 'i':
+            return Edit('d', ed.args, ed.new_line, None)
+        if ed.command == 'a':
+            return Edit('d', [len(self.lines) - len(ed.new_line)], ed.new_line, None)
+        return Edit(ed.command, ed.args, ed.new_line, ed.old_line)
+
+    def undo(self) -> bool:
+        """Undo the last applied edit. Returns False if there was none
+            or the lines no longer match it.
+        """
+        ed = self.history.pop_applied()
+        done = ed is not None and self._undo(ed)
+        if self.log:
+            # the record holds the edit, so that it can be replayed even
+            # if the edit was made before the journal was started
+            self.log.write('U', Edit_to_bytes(ed) if done else b'')
+        return done
+
+    def _undo(self, ed: Edit) -> bool:
+        """Revert ed and push it onto the undone stack. Returns False
+            if the lines no longer match it.
+        """
+        lines = self.lines
         if ed.command == 'e':
             if ed.args[0] >= len(lines) or lines[ed.args[0]] != ed.new_line:
-                return
+                return False
             lines[ed.args[0]] = ed.old_line
         elif ed.command == 'd':
-            if ed.args[0] > len(lines):
-                lines.append(ed.old_line)
-            else:
-                lines.insert(ed.args[0], ed.old_line)
+            lines[ed.args[0]:ed.args[0]] = ed.old_line
         elif ed.command == 'i':
-            if ed.args[0] >= len(lines) or lines[ed.args[0]] != ed.new_line:
-                return
-            del lines[ed.args[0]]
+            end = ed.args[0] + len(ed.new_line)
+            if end > len(lines) or lines[ed.args[0]:end] != ed.new_line:
+                return False
+            del lines[ed.args[0]:end]
         elif ed.command == 'a':
-            if lines[-1] != ed.new_line:
-                return
-        del lines[-1]
-        undone_edits.append(ed)
+            start = len(lines) - len(ed.new_line)
+            if start < 0 or lines[start:] != ed.new_line:
+                return False
+            del lines[start:]
+        elif ed.command == 's':
+            if ed.args[-1] >= len(lines) or [lines[i] for i in ed.args] != ed.new_line:
+                return False
+            for i, line in zip(ed.args, ed.old_line):
+                lines[i] = line
+        self.history.push_undone(ed)
+        return True
 
-    def redo():
-        if not len(undone_edits):
-            return
-        ed = undone_edits.pop()
+    def redo(self) -> bool:
+        """Redo the last undone edit. Returns False if there was none
+            or the lines no longer match it.
+        """
+        ed = self.history.pop_undone()
+        done = ed is not None and self._redo(ed)
+        if self.log:
+            # the record holds the edit, so that it can be replayed even
+            # if the edit was made before the journal was started
+            self.log.write('R', Edit_to_bytes(ed) if done else b'')
+        return done
+
+    def _redo(self, ed: Edit) -> bool:
+        """Reapply ed and push it onto the applied stack. Returns False
+            if the lines no longer match it.
+        """
+        lines = self.lines
         if ed.command == 'e':
             if ed.args[0] >= len(lines) or lines[ed.args[0]] != ed.old_line:
-                return
+                return False
             lines[ed.args[0]] = ed.new_line
         elif ed.command == 'd':
-            if ed.args[0] >= len(lines) or lines[ed.args[0]] != ed.old_line:
-                return
-            del lines[ed.args[0]]
+            end = ed.args[0] + len(ed.old_line)
+            if end > len(lines) or lines[ed.args[0]:end] != ed.old_line:
+                return False
+            del lines[ed.args[0]:end]
         elif ed.command == 'i':
-            if ed.args[0] >= len(lines):
-                return
-            lines[ed.args[0]] = ed.new_line
+            if ed.args[0] > len(lines):
+                return False
+            lines[ed.args[0]:ed.args[0]] = ed.new_line
         elif ed.command == 'a':
-            lines.append(ed.new_line)
-        applied_edits.append(ed)
+            lines.extend(ed.new_line)
+        elif ed.command == 's':
+            if ed.args[-1] >= len(lines) or [lines[i] for i in ed.args] != ed.old_line:
+                return False
+            for i, line in zip(ed.args, ed.new_line):
+                lines[i] = line
+        self.history.push_redone(ed)
+        return True
+
+    def _line_search(self):
+        if self.search is None:
+            from editor_search import LineSearch
+            self.search = LineSearch()
+        return self.search
+
+    def find(self, term: str, index: int = 0) -> int:
+        """Returns the first line at or after index that contains term,
+            ignoring case, or -1.
+        """
+        return self._line_search().next(self.lines, term, self.history.revision(), index)
+
+    def rfind(self, term: str, index: int) -> int:
+        """Returns the last line before index that contains term,
+            ignoring case, or -1.
+        """
+        return self._line_search().prev(self.lines, term, self.history.revision(), index)
+
+    def save(self) -> int:
+        """Write the lines to the file and mark them as saved. Returns
+            the number of bytes written.
+        """
+        lines = self.lines
+        # anything but a list is a LazyLines reading the file
+        if type(lines) is not list:
+            size = write_file(self.fpath, lines, replace=False, newline=self.newline)
+            # an open file cannot be replaced on Windows
+            lines.close()
+            try:
+                replace_file(f'{self.fpath}.tmp', self.fpath)
+            except:
+                # the original file is intact, so keep editing it
+                lines.file = open(self.fpath, 'rb')
+                raise
+        else:
+            size = write_file(self.fpath, lines, newline=self.newline)
+        if self.lazy:
+            self.lines = open_lines(self.fpath, self.lazy)
+        self.history.mark_saved()
+        if self.log:
+            self.log.clear()
+            self._start_log()
+        return size
+
+    def is_dirty(self) -> bool:
+        return self.history.is_dirty()
+
+    def _header(self) -> bytes:
+        """The journal header: the size and CRC32 of the file the
+            journaled commands apply to.
+        """
+        return file_size(self.fpath).to_bytes(4, 'big') + file_crc(self.fpath).to_bytes(4, 'big')
+
+    def _start_log(self):
+        self.log.write('H', self._header())
+        self.log.flush()
+
+    def read_journal(self) -> list[tuple[str, bytes]]|None:
+        """Returns the records that an earlier session left in the
+            journal, [] if there are none, or None if the journal does
+            not match the file.
+        """
+        from editor_journal import read_journal
+        records = read_journal(self.log.path)
+        if not records:
+            return []
+        if records[0] != ('H', self._header()):
+            return None
+        return records[1:]
+
+    def start_journal(self, records: list[tuple[str, bytes]] = None):
+        """Replay the records returned by read_journal, if any, and keep
+            appending to that journal; otherwise start a new journal.
+        """
+        if not records:
+            self.log.clear()
+            self._start_log()
+            return
+        # replay without journaling; the records stay in the file
+        log, self.log = self.log, None
+        for kind, payload in records:
+            if kind == 'A':
+                self.apply(Edit_from_bytes(payload))
+            elif not payload:
+                # an undo or redo that changed nothing
+                continue
+            elif kind == 'U':
+                if self.history.top_record() == payload:
+                    self.undo()
+                else:
+                    # the edit predates the journal, so it is not in the
+                    # replayed history; revert it with a new edit instead
+                    self.apply(self._inverse(Edit_from_bytes(payload)))
+            elif kind == 'R':
+                if self.history.top_record(True) == payload:
+                    self.redo()
+                else:
+                    self.apply(Edit_from_bytes(payload))
+        self.log = log
+
+    def close(self, keep_journal: bool = False):
+        """Release the file and history resources. The journal is
+            deleted unless keep_journal is True.
+        """
+        self.history.close()
+        if type(self.lines) is not list:
+            self.lines.close()
+        if self.log and not keep_journal:
+            self.log.clear()
+
+
+def edit(fpath: str, page_size: int = 42, history_buffer_size: int = 100, lazy: bool = False,
+         ansi: bool = True, show_banner: bool = True, show_bytes: bool = False,
+         history_buffer_bytes: int = 16384, history_spill_path: str = None, journal: bool = False,
+         journal_flush_records: int = 8, journal_flush_interval: int = 5, script=None,
+         profile: bool = False, profile_path: str = None,
+         replay_journal: bool = None, screen_rows: int = None) -> int:
+    """Edit a file. This is the main function for this library; it is an
+        interactive front-end for a Buffer. If lazy=True, the file is
+        indexed instead of read into memory, and only the displayed and
+        edited lines are held in memory; use this for files larger than
+        available memory. If ansi=True, only the lines that changed are
+        redrawn after each command; set it to False for terminals that
+        do not support ANSI escape codes. A frame taller than the
+        terminal (screen_rows, or the size the OS reports; MicroPython
+        cannot tell) is printed in full instead. The command banner can
+        be toggled with the b[anner] command. If show_bytes=True, the
+        status line also shows how many bytes the previous redraw sent
+        to the terminal. The edit history holds at most
+        history_buffer_size edits and history_buffer_bytes of edited
+        text; if history_spill_path is set, older edits (and an edit
+        larger than history_buffer_bytes) are moved to that file
+        instead of being dropped. If journal=True, every edit, undo,
+        and redo is appended to a journal file next to the file
+        (flushed every journal_flush_records records or
+        journal_flush_interval seconds while commands keep coming from a
+        script, and before waiting for the next typed command) until the
+        file is written; if the editor is reset before then, the journal
+        is replayed the next time the file is opened. If script is an iterable of lines
+        (e.g. an open file), commands and their input lines are read
+        from it instead of the terminal and nothing is drawn; the first
+        error is written to stderr and stops the script. If
+        profile=True, the time each command spent parsing, applying,
+        rendering, and writing to the terminal, the bytes it sent, and
+        the free (MicroPython) or used (CPython) heap are shown on a
+        second status line; if profile_path is also set, the last 100
+        commands are appended to it as CSV on quit. A journal left by an
+        earlier session is replayed if the user agrees, or, if
+        replay_journal is True or False, replayed or discarded without
+        asking; a script discards it unless replay_journal is True.
+        Returns 0, or 1 if a script failed or ended with unsaved edits.
+    """
+    buffer = Buffer(
+        fpath, lazy, history_buffer_size, history_buffer_bytes, history_spill_path,
+        journal, journal_flush_records, journal_flush_interval
+    )
+    original_page_size = page_size
+    read = input
+    if script is not None:
+        script = iter(script)
+
+        def read(prompt: str = '') -> str:
+            try:
+                return next(script).rstrip('\\r\\n')
+            except StopIteration:
+                raise EOFError()
+
+    if buffer.log:
+        records = buffer.read_journal()
+        replay = False
+        if records and replay_journal is None and script is None:
+            print(f'Found {len(records)} unsaved journaled commands for {fpath}.')
+            replay = read('Replay them? [Y/n]: ').lower() not in ('n', 'no')
+        elif records:
+            # never take the answer from a script
+            replay = bool(replay_journal)
+            if not replay and script is not None:
+                sys.stderr.write(f'{fpath}: discarding {len(records)} unsaved journaled commands\\n')
+        elif records is None and script is None:
+            print(f'Ignoring {buffer.log.path}: it does not match {fpath}.')
+            read('Press enter to continue.')
+        elif records is None:
+            sys.stderr.write(f'{fpath}: ignoring {buffer.log.path}: it does not match the file\\n')
+        buffer.start_journal(records if replay else None)
 
-    lines = read_file(fpath)
-    check = checksum(applied_edits)
     page = 0
     error = ''
+    message = ''
+    exit_status = 0
     offset = 0
-    while True:
-        if hasattr(os, 'system') and hasattr(os, 'name'):
-            try:
-                os.system('cls' if os.name == 'nt' else 'clear')
-            except:
-                ...
+    term = ''
+    match = -1
+    highlight = -1
+    unrecorded = buffer.history.unrecorded
+    screen = Screen(ansi, show_bytes or profile, screen_rows)
+    profiler = None
+    if profile:
+        from editor_profile import Profiler
+        profiler = Profiler(profile_path)
+        untimed = read
 
-        start = page * page_size + offset
-        stop = min((page + 1) * page_size + offset, len(lines))
-        print(f"Displaying lines {start}-{stop-1}")
+        def read(prompt: str = '') -> str:
+            return profiler.read(untimed, prompt)
 
-        for i in range(start, stop):
-            line = lines[i]
-            spaces = len(line) - len(line.lstrip())
-            line = ''.join([' ' if i % 4 else '_' for i in range(spaces)]) + line.lstrip()
-            print(f"[{pad_line_no(i, stop-1)}]: {line}")
+    def read_line() -> str:
+        """Read a line of command input, which may scroll the terminal
+            under the frame, so the next draw redraws all of it.
+        """
+        screen.invalidate()
+        return read('')
+
+    try:
+        while True:
+            if profiler:
+                profiler.mark('apply')
+            lines = buffer.lines
+            if buffer.history.unrecorded != unrecorded:
+                unrecorded = buffer.history.unrecorded
+                note = 'The edit is too large for the history and cannot be undone'
+                message = f'{message}; {note}' if message else note
+            start = page * page_size + offset
+            stop = min((page + 1) * page_size + offset, len(lines))
+            if script is not None:
+                if error:
+                    sys.stderr.write(f'{fpath}: {error}\\n')
+                    exit_status = 1
+                    break
+                message = ''
+                highlight = -1
+            else:
+                frame = [f"Displaying lines {start}-{stop-1}"]
 
-        print("\\nCommands: [r]e[place] {lineno} {count=1}|d[elete] {lineno} {count=1}|i[nsert] {lineno} {count=1}|a[ppend] {count=1}\\n" + \\
-            "          c[hange] {pagesize=42}|o[ffset] {lines}|n[ext]|p[revious]|s[elect] {pageno}\\n" + \\
-            "          u[ndo] {count=1}|r[edo] {count=1}|w[rite]|q[uit]")
-        if error:
-            print(error)
-            error = None
+                for i in range(start, stop):
+                    line = lines[i]
+                    spaces = len(line) - len(line.lstrip())
+                    line = ''.join([' ' if i % 4 else '_' for i in range(spaces)]) + line.lstrip()
+                    if i == highlight and ansi:
+                        frame.append(f"\\x1b[7m[{pad_line_no(i, stop-1)}]\\x1b[0m: {line}")
+                    else:
+                        frame.append(f"[{pad_line_no(i, stop-1)}]: {line}")
+                highlight = -1
 
-        command = input("? ").lower().lstrip().split(' ')
-        try:
-            index = int(f"0{command[1]}") if len(command) > 1 else 0
-            index = 0 if index < 0 else index
-            count = int(f"0{command[2]}") if len(command) > 2 else 1
-            count = 1 if count < 0 else count
-        except Exception as e:
-            error = str(e)
-            continue
+                if show_banner:
+                    frame.extend([
+                        "",
+                        "Commands: [r]e[place] {lineno} {count=1}|d[elete] {lineno} {count=1}|i[nsert] {lineno} {count=1}|a[ppend] {count=1}",
+                        "          c[hange] {pagesize=42}|o[ffset] {lines}|n[ext]|p[revious]|s[elect] {pageno}",
+                        "          u[ndo] {count=1}|r[edo] {count=1}|w[rite]|q[uit]|b[anner]",
+                        "          /{text} (search forward)|?{text} (search backward)|:[first[,last]]s/old/new/[r]",
+                    ])
+                status = buffer.history.status()
+                if show_bytes:
+                    status = f'{status}; last redraw: {screen.last_bytes} bytes; total: {screen.total_bytes} bytes'
+                frame.append(status)
+                if profiler:
+                    frame.append(profiler.status())
+                if error:
+                    frame.append(error)
+                    error = ''
+                if message:
+                    frame.append(message)
+                    message = ''
+                if profiler:
+                    profiler.mark('render')
+                screen.draw(frame)
+                if profiler:
+                    profiler.mark('write')
 
-        if command[0] in ('e', 'replace'):
-            if len(command) < 2:
-                error = 'Must specify a line index for replace'
+            if profiler:
+                profiler.finish(screen.last_bytes if script is None else 0)
+            if buffer.log:
+                if script is None:
+                    # the user may be idle for any length of time, so
+                    # nothing this command journaled stays in memory
+                    buffer.log.flush()
+                else:
+                    buffer.log.tick()
+            try:
+                command = read("? ").lstrip()
+            except EOFError:
+                if script is None:
+                    raise
+                if buffer.is_dirty():
+                    sys.stderr.write(f'{fpath}: script ended with unsaved edits\\n')
+                    exit_status = 1
+                break
+            if profiler:
+                profiler.mark()
+                profiler.command = command
+            if script is not None and command[:1] == '#':
                 continue
-            end = index + count
-            while index < end:
-                line = input('')
-                if line:
-                    ed = Edit('e', [index], lines[index], line)
-                    lines[index] = line
-                    applied_edits.append(ed)
-                index += 1
-
-        elif command[0] in ('d', 'delete'):
-            if len(command) < 2:
-                error = 'Must specify a line index for delete'
+
+            if command[:1] in ('/', '?'):
+                # Search; an empty term repeats the last search from the last match
+                if command[1:]:
+                    term = command[1:]
+                    match = -1
+                if not term:
+                    error = 'Must specify a search term'
+                    continue
+                if command[0] == '/':
+                    found = buffer.find(term, match + 1 if match >= 0 else start)
+                else:
+                    found = buffer.rfind(term, match if match >= 0 else start)
+                if found < 0:
+                    error = 'Search term not found'
+                    continue
+                match = highlight = found
+                if not start <= found < stop:
+                    offset = 0
+                    page = found // page_size
+                message = f'Match at line {found}'
                 continue
-            while count > 0:
-                applied_edits.append(Edit('d', [index], lines[index], None))
-                del lines[index]
-                count -= 1
-
-        elif command[0] in ('i', 'insert'):
-            if len(command) < 2:
-                error = 'Must specify a line index for insert'
+
+            if command[:1] == ':':
+                try:
+                    from editor_search import parse_substitute
+                    changed = buffer.substitute(*parse_substitute(command[1:], len(lines)))
+                except Exception as e:
+                    error = str(e)
+                    continue
+                message = f'Substituted in {changed} line(s)' if changed else 'No lines changed'
                 continue
-            end = index + count
-            while index < end:
-                line = input('')
-                lines.insert(index, line)
-                applied_edits.append(Edit('i', [index], None, line))
-                index += 1
-
-        elif command[0] in ('a', 'append'):
-            if index > 0:
-                count = index
-            while count > 0:
-                line = input('')
-                lines.append(line)
-                applied_edits.append(Edit('a', [], None, line))
-                count -= 1
-
-        elif command[0] in ('u', 'undo'):
-            undo()
-            while index > 1:
-                index -= 1
-                undo()
-
-        elif command[0] in ('r', 'redo'):
-            redo()
-            while index > 1:
-                index -= 1
-                redo()
-
-        elif command[0] in ('c', 'change'):
-            if len(command) < 2:
-                index = original_page_size
-            page_size = index
-
-        elif command[0] in ('o', 'offset'):
-            if len(command) < 2:
-                error = 'Must specify a line count for offset'
+
+            command = command.lower().split(' ')
+            try:
+                index = int(f"0{command[1]}") if len(command) > 1 else 0
+                index = 0 if index < 0 else index
+                count = int(f"0{command[2]}") if len(command) > 2 else 1
+                count = 1 if count < 0 else count
+            except Exception as e:
+                error = str(e)
                 continue
-            offset = index
+            if profiler:
+                profiler.mark('parse')
 
-        elif command[0] in ('n', 'next'):
-            page = 0 if (page + 1) * page_size >= len(lines) else page + 1
+            if command[0] in ('e', 'replace'):
+                if len(command) < 2:
+                    error = 'Must specify a line index for replace'
+                    continue
+                end = index + count
+                if end > len(lines):
+                    error = f'Line index {end-1} is beyond end of file (length: {len(lines)})'
+                    continue
+                while index < end:
+                    line = read_line()
+                    if line:
+                        buffer.replace(index, line)
+                    index += 1
 
-        elif command[0] in ('p', 'previous'):
-            page = len(lines) // page_size if page == 0 else page - 1
+            elif command[0] in ('d', 'delete'):
+                if len(command) < 2:
+                    error = 'Must specify a line index for delete'
+                    continue
+                try:
+                    buffer.delete(index, count)
+                except ValueError as e:
+                    error = str(e)
 
-        elif command[0] in ('s', 'select'):
-            if len(command) < 2:
-                error = 'Must specify a page index to select a page'
-                continue
-            if index * page_size < len(lines):
-                page = index
-
-        elif command[0] in ('w', 'write'):
-            write_file(fpath, lines)
-            check = checksum(applied_edits)
-
-        elif command[0] in ('q', 'quit'):
-            if check != checksum(applied_edits):
-                print('Unsaved edits detected. Are you sure you want to quit?')
-                confirm = input('[y/N]: ')
-                if confirm.lower() in ('y', 'yes'):
+            elif command[0] in ('i', 'insert'):
+                if len(command) < 2:
+                    error = 'Must specify a line index for insert'
+                    continue
+                buffer.insert(index, [read_line() for _ in range(count)])
+
+            elif command[0] in ('a', 'append'):
+                if index > 0:
+                    count = index
+                buffer.append([read_line() for _ in range(count)])
+
+            elif command[0] in ('u', 'undo'):
+                buffer.undo()
+                while index > 1:
+                    index -= 1
+                    buffer.undo()
+
+            elif command[0] in ('r', 'redo'):
+                buffer.redo()
+                while index > 1:
+                    index -= 1
+                    buffer.redo()
+
+            elif command[0] in ('c', 'change'):
+                if len(command) < 2:
+                    index = original_page_size
+                page_size = index
+
+            elif command[0] in ('o', 'offset'):
+                if len(command) < 2:
+                    error = 'Must specify a line count for offset'
+                    continue
+                offset = index
+
+            elif command[0] in ('n', 'next'):
+                page = 0 if (page + 1) * page_size >= len(lines) else page + 1
+
+            elif command[0] in ('p', 'previous'):
+                page = len(lines) // page_size if page == 0 else page - 1
+
+            elif command[0] in ('s', 'select'):
+                if len(command) < 2:
+                    error = 'Must specify a page index to select a page'
+                    continue
+                if index * page_size < len(lines):
+                    page = index
+
+            elif command[0] in ('b', 'banner'):
+                show_banner = not show_banner
+
+            elif command[0] in ('w', 'write'):
+                began = ticks_ms()
+                size = buffer.save()
+                elapsed = ticks_diff(ticks_ms(), began)
+                message = (f'Wrote {size} bytes in {elapsed} ms ({size * 1000 // max(elapsed, 1)} '
+                    f'bytes/s, {WRITE_CHUNK_SIZE} byte buffer)')
+
+            elif command[0] in ('q', 'quit'):
+                if buffer.is_dirty() and script is None:
+                    print('Unsaved edits detected. Are you sure you want to quit?')
+                    confirm = input('[y/N]: ')
+                    if confirm.lower() in ('y', 'yes'):
+                        break
+                    screen.invalidate()
+                else:
                     break
-            else:
-                break
+
+            elif command[0]:
+                error = f'Unknown command: {command[0]}'
+
+    except EOFError:
+        if script is None:
+            buffer.close(keep_journal=True)
+            raise
+        sys.stderr.write(f'{fpath}: unexpected end of script\\n')
+        exit_status = 1
+    except:
+        buffer.close(keep_journal=True)
+        raise
+    finally:
+        if profiler:
+            profiler.close()
+    buffer.close()
+    return exit_status
+
+def batch_edit(fpath: str, script_path: str = '-', **kwargs) -> int:
+    """Apply the commands in a script file, or stdin if script_path is
+        '-', to a file without drawing anything. The script uses the
+        same commands as edit, each followed by its input lines, e.g.
+        "e 3" and then the new line 3. Lines starting with # are
+        ignored where a command is expected. Other keyword arguments
+        are passed to edit. Returns 0 on success and 1 on failure.
+    """
+    if script_path == '-':
+        return edit(fpath, script=sys.stdin, **kwargs)
+    with open(script_path, 'r') as f:
+        return edit(fpath, script=f, **kwargs)
 
 
 if __name__ == '__main__':
-    if len(argv) > 1:
+    lazy = '--lazy' in argv
+    replay_journal = '--replay-journal' in argv
+    journal = replay_journal or '--journal' in argv
+    profile = '--profile' in argv
+    script_path = None
+    if '--script' in argv:
+        i = argv.index('--script')
+        script_path = argv[i+1] if len(argv) > i + 1 else '-'
+        argv = argv[:i] + argv[i+2:]
+    argv = [a for a in argv if a not in ('--lazy', '--journal', '--replay-journal', '--profile')]
+    if len(argv) > 1 and script_path:
+        sys.exit(batch_edit(argv[1], script_path, lazy=lazy, journal=journal, profile=profile,
+                            replay_journal=replay_journal))
+    elif len(argv) > 1:
         filename = argv[1]
         page_size = int(f"0{argv[2]}") if len(argv) > 2 else 0
         if page_size:
-            edit(filename, page_size)
+            edit(filename, page_size, lazy=lazy, journal=journal, profile=profile)
         else:
-            edit(filename)
+            edit(filename, lazy=lazy, journal=journal, profile=profile)
     else:
-        print(f'Usage: {argv[0]} /path/to/file [page_size]')
+        print(f'Usage: {argv[0]} /path/to/file [page_size] [--lazy] [--journal] [--profile] [--script {{path|-}}]')
         print('       The page_size parameter is optional; default is 42')
+        print('       The --lazy flag reads only the displayed lines from the file')
+        print('       The --journal flag journals unsaved edits for recovery after a reset')
+        print('       The --profile flag shows per-command timings, bytes sent, and heap use')
+        print('       The --script flag applies the commands in a file (or stdin) without drawing')
+        print('       The --replay-journal flag replays a leftover journal first instead of')
+        print('       asking or, with --script, discarding it')
 
 
@@ -0,0 +1,113 @@
+from time import time
+import os
+
+
+"""
+ISC License
+
+Copyleft (c) 2025 Jonathan Voss (k98kurz)
+
+Permission to use, copy, modify, and/or distribute this software
+for any purpose with or without fee is hereby granted, provided
+that the above copyleft notice and this permission notice appear in
+all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL
+WARRANTIES WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE
+AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT, INDIRECT, OR
+CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM LOSS
+OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT,
+NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
+CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+
+class Journal:
+    """Append-only journal of the commands that changed a file since it
+        was last written, so that unsaved edits survive a reset. Each
+        record is a one-character kind ('H' header, 'A' applied edit,
+        'U' undo, 'R' redo), a 4-byte payload length, and the payload.
+        Records are buffered in memory and flushed to the journal file
+        after flush_records records, or by tick once flush_interval
+        seconds have passed since the oldest buffered record. The 'U'
+        and 'R' payloads are the undone or redone edit, or empty if
+        there was nothing to undo or redo.
+    """
+    __slots__ = ('path', 'file', 'buffer', 'pending', 'flush_records', 'flush_interval', 'first_pending')
+
+    def __init__(self, path: str, flush_records: int = 8, flush_interval: int = 5):
+        self.path = path
+        self.file = None
+        self.buffer = bytearray()
+        self.pending = 0
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self.first_pending = 0
+
+    def write(self, kind: str, payload: bytes = b''):
+        if not self.pending:
+            self.first_pending = time()
+        self.buffer.extend(kind.encode())
+        self.buffer.extend(len(payload).to_bytes(4, 'big'))
+        self.buffer.extend(payload)
+        self.pending += 1
+        if self.pending >= self.flush_records:
+            self.flush()
+
+    def tick(self):
+        """Flush buffered records if flush_interval has passed since
+            the oldest of them was written.
+        """
+        if self.pending and time() - self.first_pending >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+        self.file.write(self.buffer)
+        sync_file(self.file)
+        self.buffer = bytearray()
+        self.pending = 0
+
+    def clear(self):
+        """Discard the journal, e.g. once the file has been written."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.buffer = bytearray()
+        self.pending = 0
+        try:
+            os.remove(self.path)
+        except OSError:
+            ...
+
+def read_journal(path: str) -> list[tuple[str, bytes]]:
+    """Read the complete records of a journal file. A record cut short
+        by a reset is ignored. Returns an empty list if there is no
+        journal.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return []
+    records = []
+    i = 0
+    while i + 5 <= len(data):
+        size = int.from_bytes(data[i+1:i+5], 'big')
+        if i + 5 + size > len(data):
+            break
+        records.append((chr(data[i]), data[i+5:i+5+size]))
+        i += 5 + size
+    return records
+
+def sync_file(f):
+    """Flush a file and make sure its contents have reached storage."""
+    f.flush()
+    if hasattr(os, 'fsync'):
+        os.fsync(f.fileno())
+    elif hasattr(os, 'sync'):
+        os.sync()
@@ -0,0 +1,163 @@
+from array import array
+
+
+"""
+ISC License
+
+Copyleft (c) 2025 Jonathan Voss (k98kurz)
+
+Permission to use, copy, modify, and/or distribute this software
+for any purpose with or without fee is hereby granted, provided
+that the above copyleft notice and this permission notice appear in
+all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL
+WARRANTIES WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE
+AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT, INDIRECT, OR
+CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM LOSS
+OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT,
+NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
+CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+
+class LazyLines:
+    """List-like view of the lines of a text file that only reads the
+        lines that are accessed. The file is scanned once in fixed-size
+        chunks to build a compact index of line start offsets. Edited
+        and inserted lines are kept in memory, and the current sequence
+        of lines is described by a list of pieces of the form (source,
+        start, count), where source 0 is the file's line index and
+        source 1 is the list of added lines. Call close() when done.
+    """
+    __slots__ = ('file', 'offsets', 'added', 'pieces', 'length')
+
+    def __init__(self, fpath: str, chunk_size: int = 1024):
+        self.file = open(fpath, 'rb')
+        # offsets[i] is the start of line i; the final entry is one past
+        # the end of the file so that every line ends at offsets[i+1]-1
+        self.offsets = array('I', [0])
+        pos = 0
+        while True:
+            chunk = self.file.read(chunk_size)
+            if not chunk:
+                break
+            i = chunk.find(b'\n')
+            while i >= 0:
+                self.offsets.append(pos + i + 1)
+                i = chunk.find(b'\n', i + 1)
+            pos += len(chunk)
+        self.offsets.append(pos + 1)
+        self.added = []
+        self.length = len(self.offsets) - 1
+        self.pieces = [(0, 0, self.length)]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        for src, start, count in self.pieces:
+            for i in range(start, start + count):
+                yield self.added[i] if src else self._read_line(i)
+
+    def __getitem__(self, key: int|slice) -> str|list[str]:
+        if type(key) is slice:
+            start, stop, step = key.indices(self.length)
+            return [self[i] for i in range(start, stop, step)]
+        src, i = self._locate(key)
+        return self.added[i] if src else self._read_line(i)
+
+    def __setitem__(self, key: int|slice, line: str|list[str]):
+        if type(key) is slice:
+            start, stop, _ = key.indices(self.length)
+            del self[start:stop]
+            self._insert(start, line)
+            return
+        index = self._index(key)
+        i = self._split(index)
+        self._split(index + 1)
+        self.pieces[i] = (1, len(self.added), 1)
+        self.added.append(line)
+
+    def __delitem__(self, key: int|slice):
+        if type(key) is slice:
+            start, stop, _ = key.indices(self.length)
+        else:
+            start = self._index(key)
+            stop = start + 1
+        if start >= stop:
+            return
+        i = self._split(start)
+        j = self._split(stop)
+        del self.pieces[i:j]
+        self.length -= stop - start
+
+    def _index(self, index: int) -> int:
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError('LazyLines index out of range')
+        return index
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        """Return the (source, index within source) for a line."""
+        index = self._index(index)
+        pos = 0
+        for src, start, count in self.pieces:
+            if index < pos + count:
+                return src, start + index - pos
+            pos += count
+
+    def _split(self, index: int) -> int:
+        """Ensure a piece boundary exists at index. Returns the index of
+            the piece that starts there (or len(pieces) at the end).
+        """
+        pos = 0
+        for i in range(len(self.pieces)):
+            src, start, count = self.pieces[i]
+            if index == pos:
+                return i
+            if index < pos + count:
+                within = index - pos
+                self.pieces[i] = (src, start, within)
+                self.pieces.insert(i + 1, (src, start + within, count - within))
+                return i + 1
+            pos += count
+        return len(self.pieces)
+
+    def _read_line(self, i: int) -> str:
+        """Read line i of the file, without its line ending."""
+        start = self.offsets[i]
+        self.file.seek(start)
+        data = self.file.read(self.offsets[i+1] - 1 - start)
+        if data[-1:] == b'\r':
+            data = data[:-1]
+        return data.decode()
+
+    def _insert(self, index: int, lines: list[str]):
+        """Insert a list of lines as a single piece."""
+        if not lines:
+            return
+        index = min(max(index, 0), self.length)
+        i = self._split(index)
+        prev = self.pieces[i-1] if i else None
+        if prev and prev[0] == 1 and prev[1] + prev[2] == len(self.added):
+            # extend the previous piece if it ends at the added lines tail
+            self.pieces[i-1] = (1, prev[1], prev[2] + len(lines))
+        else:
+            self.pieces.insert(i, (1, len(self.added), len(lines)))
+        self.added.extend(lines)
+        self.length += len(lines)
+
+    def insert(self, index: int, line: str):
+        self._insert(index, [line])
+
+    def append(self, line: str):
+        self._insert(self.length, [line])
+
+    def extend(self, lines: list[str]):
+        self._insert(self.length, list(lines))
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,139 @@
+from collections import deque
+import gc
+import os
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+    def ticks_us() -> int:
+        return int(perf_counter() * 1_000_000)
+    def ticks_diff(end: int, start: int) -> int:
+        return end - start
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+"""
+ISC License
+
+Copyleft (c) 2025 Jonathan Voss (k98kurz)
+
+Permission to use, copy, modify, and/or distribute this software
+for any purpose with or without fee is hereby granted, provided
+that the above copyleft notice and this permission notice appear in
+all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL
+WARRANTIES WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE
+AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT, INDIRECT, OR
+CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM LOSS
+OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT,
+NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
+CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+
+class Profiler:
+    """Per-command timings for the interactive loop. Each command is
+        split into four phases: parse (reading its arguments), apply
+        (running it), render (building the next frame), and write
+        (sending the frame to the terminal). mark(phase) adds the time
+        since the previous mark to that phase, and finish() closes the
+        command with the bytes sent to the terminal and a heap sample:
+        the free heap from gc.mem_free() on MicroPython, or the heap in
+        use traced by tracemalloc on CPython. The last size commands
+        are kept, and close() appends them to path as CSV if it is set.
+    """
+    __slots__ = ('path', 'records', 'times', 'last', 'idle', 'command', 'latest', 'traced')
+
+    def __init__(self, path: str = None, size: int = 100):
+        self.path = path
+        self.records = deque([], size)
+        self.times = {'parse': 0, 'apply': 0, 'render': 0, 'write': 0}
+        self.last = ticks_us()
+        self.idle = 0
+        self.command = ''
+        self.latest = None
+        self.traced = False
+        if not hasattr(gc, 'mem_free') and tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.traced = True
+
+    def mark(self, phase: str = None):
+        """Add the time since the last mark to phase, or discard it
+            (e.g. time spent waiting for input) if phase is None.
+        """
+        now = ticks_us()
+        if phase is not None:
+            self.times[phase] += ticks_diff(now, self.last) - self.idle
+        self.last = now
+        self.idle = 0
+
+    def read(self, read, prompt: str = '') -> str:
+        """Call read(prompt), leaving the time spent waiting for input
+            out of the current phase.
+        """
+        began = ticks_us()
+        try:
+            return read(prompt)
+        finally:
+            self.idle += ticks_diff(ticks_us(), began)
+
+    def heap(self) -> int:
+        if hasattr(gc, 'mem_free'):
+            return gc.mem_free()
+        if tracemalloc and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return -1
+
+    def finish(self, sent: int):
+        """Record the current command, if any, and start the next one."""
+        times = self.times
+        if self.command:
+            self.latest = (
+                self.command, times['parse'], times['apply'], times['render'],
+                times['write'], sent, self.heap()
+            )
+            self.records.append(self.latest)
+        self.command = ''
+        for phase in times:
+            times[phase] = 0
+
+    def status(self) -> str:
+        if self.latest is None:
+            return 'Profile: no commands yet'
+        command, parse, apply, render, write, sent, heap = self.latest
+        heap = f"heap {'free' if hasattr(gc, 'mem_free') else 'used'}: {heap} bytes"
+        return f'Last command: parse {parse} us, apply {apply} us, render {render} us, ' + \
+            f'write {write} us; sent {sent} bytes; {heap}'
+
+    def dump(self, path: str) -> int:
+        """Append the recorded commands to path as CSV, with a header
+            if the file is new. Returns the number of records written.
+        """
+        new = not file_size(path)
+        with open(path, 'a') as f:
+            if new:
+                f.write('command,parse_us,apply_us,render_us,write_us,sent_bytes,heap_bytes\n')
+            for record in self.records:
+                f.write(','.join([str(v).replace(',', ' ') for v in record]) + '\n')
+        return len(self.records)
+
+    def close(self):
+        if self.path and len(self.records):
+            self.dump(self.path)
+        if self.traced:
+            tracemalloc.stop()
+            self.traced = False
+
+
+def file_size(fpath: str) -> int:
+    try:
+        return os.stat(fpath)[6]
+    except OSError:
+        return 0
@@ -0,0 +1,84 @@
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+
+"""
+ISC License
+
+Copyleft (c) 2025 Jonathan Voss (k98kurz)
+
+Permission to use, copy, modify, and/or distribute this software
+for any purpose with or without fee is hereby granted, provided
+that the above copyleft notice and this permission notice appear in
+all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL
+WARRANTIES WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE
+AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT, INDIRECT, OR
+CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM LOSS
+OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT,
+NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
+CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+
+class FileReader:
+    """Read-only view of a file that supports len() and slicing like a
+        bytes object, but only reads the requested bytes from disk. It
+        uses mmap where available and seek/readinto otherwise. Call
+        close() when done with it.
+    """
+    __slots__ = ('file', 'map', 'length', 'buffer')
+
+    def __init__(self, fpath: str, buffer_size: int = 4096):
+        self.file = open(fpath, 'rb')
+        self.file.seek(0, 2)
+        self.length = self.file.tell()
+        self.map = None
+        if mmap and self.length:
+            try:
+                self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            except:
+                ...
+        self.buffer = None if self.map else bytearray(buffer_size)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, key: slice) -> bytes:
+        start, stop, _ = key.indices(self.length)
+        if stop <= start:
+            return b''
+        if self.map:
+            return self.map[start:stop]
+        self.file.seek(start)
+        return self.file.read(stop - start)
+
+    def blocks(self, start: int, stop: int):
+        """Yield the bytes from start through stop in blocks no larger
+            than the read buffer. Without mmap, each block is a
+            memoryview into the shared buffer and is only valid until
+            the next block is read.
+        """
+        if self.map:
+            while start < stop:
+                yield self.map[start:min(stop, start + 4096)]
+                start += 4096
+            return
+        mv = memoryview(self.buffer)
+        self.file.seek(start)
+        while start < stop:
+            n = self.file.readinto(mv[:min(stop - start, len(mv))])
+            if not n:
+                break
+            yield mv[:n]
+            start += n
+
+    def close(self):
+        if self.map:
+            self.map.close()
+            self.map = None
+        self.file.close()
@@ -0,0 +1,147 @@
+from array import array
+import re
+
+
+"""
+ISC License
+
+Copyleft (c) 2025 Jonathan Voss (k98kurz)
+
+Permission to use, copy, modify, and/or distribute this software
+for any purpose with or without fee is hereby granted, provided
+that the above copyleft notice and this permission notice appear in
+all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL
+WARRANTIES WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE
+AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT, INDIRECT, OR
+CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM LOSS
+OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT,
+NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
+CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+
+class LineSearch:
+    """Cache of the lines known to contain a search term, so that
+        repeated searches for the same term do not read and lowercase
+        the same lines again. Lines lo through hi have been scanned,
+        and matches holds the indices of the matching lines among them
+        in order. Scanning starts at the line the search starts from
+        and stops at the first match. The cache is reset when the term
+        or the history revision changes, or when a search starts
+        outside the scanned lines. Searches ignore case.
+    """
+    __slots__ = ('term', 'revision', 'lo', 'hi', 'matches')
+
+    def __init__(self):
+        self.term = ''
+        self.revision = -1
+        self.lo = 0
+        self.hi = 0
+        self.matches = array('I')
+
+    def _check(self, term: str, revision: int, index: int):
+        if term != self.term or revision != self.revision or not self.lo <= index <= self.hi:
+            self.term = term
+            self.revision = revision
+            self.lo = index
+            self.hi = index
+            self.matches = array('I')
+
+    def _bisect(self, index: int) -> int:
+        """Returns the position of the first cached match >= index."""
+        lo, hi = 0, len(self.matches)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.matches[mid] < index:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def next(self, lines: list[str], term: str, revision: int, index: int) -> int:
+        """Returns the first line at or after index that contains term,
+            or -1.
+        """
+        term = term.lower()
+        self._check(term, revision, index)
+        i = self._bisect(index)
+        if i < len(self.matches):
+            return self.matches[i]
+        for i in range(self.hi, len(lines)):
+            self.hi = i + 1
+            if term in lines[i].lower():
+                self.matches.append(i)
+                return i
+        return -1
+
+    def prev(self, lines: list[str], term: str, revision: int, index: int) -> int:
+        """Returns the last line before index that contains term, or -1."""
+        term = term.lower()
+        index = min(index, len(lines))
+        self._check(term, revision, index)
+        i = self._bisect(index)
+        if i:
+            return self.matches[i-1]
+        for i in range(self.lo - 1, -1, -1):
+            self.lo = i
+            if term in lines[i].lower():
+                self.matches = array('I', [i]) + self.matches
+                return i
+        return -1
+
+def parse_substitute(command: str, length: int) -> tuple[int, int, str, str, bool]:
+    """Parse a substitute command of the form [first[,last]]s/old/new/[r]
+        into (first, last, old, new, regex). Without a range, every
+        line is included; with one line number, only that line is. Any
+        character after the s can be used instead of /. Raises
+        ValueError if the command is malformed.
+    """
+    usage = 'Usage: :[first[,last]]s/old/new/[r]'
+    i = command.find('s')
+    if i < 0 or len(command) < i + 2:
+        raise ValueError(usage)
+    bounds = command[:i].split(',') if command[:i] else []
+    if len(bounds) > 2:
+        raise ValueError(usage)
+    first = int(bounds[0]) if bounds else 0
+    last = int(bounds[-1]) if bounds else length - 1
+    parts = command[i+2:].split(command[i+1])
+    if len(parts) < 2 or len(parts) > 3 or not parts[0]:
+        raise ValueError(usage)
+    flags = parts[2] if len(parts) > 2 else ''
+    if flags not in ('', 'r'):
+        raise ValueError(f'Unknown substitute flag(s): {flags}')
+    return (first, last, parts[0], parts[1], flags == 'r')
+
+def substitute(lines: list[str], first: int, last: int, old: str, new: str,
+               regex: bool = False) -> tuple[list[int], list[str], list[str]]|None:
+    """Replace every occurrence of old with new in lines first through
+        last, in one pass. If regex=True, old is a regular expression
+        (compiled once) and new may refer to its groups. The lines are
+        not modified; returns the indices of the changed lines and the
+        lines before and after, as the args, old_line, and new_line of
+        an 's' Edit, or None if no line changed. Raises ValueError if a
+        replacement would split a line.
+    """
+    pattern = re.compile(old) if regex else None
+    indices = []
+    old_lines = []
+    new_lines = []
+    for i in range(max(first, 0), min(last + 1, len(lines))):
+        line = lines[i]
+        if pattern:
+            changed = pattern.sub(new, line)
+        elif old in line:
+            changed = line.replace(old, new)
+        else:
+            continue
+        if changed != line:
+            if '\n' in changed:
+                raise ValueError(f'Substitution would split line {i}')
+            indices.append(i)
+            old_lines.append(line)
+            new_lines.append(changed)
+    return (indices, old_lines, new_lines) if indices else None
@@ -0,0 +1,82 @@
+from array import array
+import os
+
+
+"""
+ISC License
+
+Copyleft (c) 2025 Jonathan Voss (k98kurz)
+
+Permission to use, copy, modify, and/or distribute this software
+for any purpose with or without fee is hereby granted, provided
+that the above copyleft notice and this permission notice appear in
+all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL
+WARRANTIES WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE
+AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT, INDIRECT, OR
+CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM LOSS
+OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT,
+NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
+CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+
+class Spill:
+    """File of the encoded edits pushed out of the bottom of a History,
+        paged back in most recent first. Spilled edit i starts at
+        offsets[i], holds sizes[i] bytes of edit content, and produced
+        revisions[i]; only the first count are in use. The file is
+        created on the first push; call close() to delete it.
+    """
+    __slots__ = ('path', 'file', 'end', 'count', 'offsets', 'sizes', 'revisions')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.end = 0
+        self.count = 0
+        self.offsets = array('I')
+        self.sizes = array('I')
+        self.revisions = array('I')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def revision(self) -> int:
+        """Returns the revision produced by the last spilled edit, or 0."""
+        return self.revisions[self.count-1] if self.count else 0
+
+    def push(self, record: bytes, size: int, revision: int):
+        if self.file is None:
+            self.file = open(self.path, 'w+b')
+        self.file.seek(self.end)
+        self.file.write(record)
+        if self.count < len(self.offsets):
+            self.offsets[self.count] = self.end
+            self.sizes[self.count] = size
+            self.revisions[self.count] = revision
+        else:
+            self.offsets.append(self.end)
+            self.sizes.append(size)
+            self.revisions.append(revision)
+        self.count += 1
+        self.end += len(record)
+
+    def pop(self) -> tuple[bytes, int, int]:
+        """Remove the last spilled edit. Returns its (record, size,
+            revision).
+        """
+        self.count -= 1
+        start = self.offsets[self.count]
+        self.file.seek(start)
+        record = self.file.read(self.end - start)
+        self.end = start
+        return record, self.sizes[self.count], self.revisions[self.count]
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.remove(self.path)
@@ -0,0 +1,97 @@
+"""
+ISC License
+
+Copyleft (c) 2025 Jonathan Voss (k98kurz)
+
+Permission to use, copy, modify, and/or distribute this software
+for any purpose with or without fee is hereby granted, provided
+that the above copyleft notice and this permission notice appear in
+all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL
+WARRANTIES WITH REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED
+WARRANTIES OF MERCHANTABILITY AND FITNESS. IN NO EVENT SHALL THE
+AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT, INDIRECT, OR
+CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM LOSS
+OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT,
+NEGLIGENCE OR OTHER TORTIOUS ACTION, ARISING OUT OF OR IN
+CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
+"""
+
+
+def cat(fname: str) -> str:
+    """Returns the str contents of a file. Intended to be used with
+        `print` or another utility function from this library.
+    """
+    with open(fname, 'r') as f:
+        return f.read()
+
+def bat(fname: str) -> bytes:
+    """Returns the bytes contents of a file. Similar to cat."""
+    with open(fname, 'rb') as f:
+        return f.read()
+
+def to_lines(data: str) -> list[str]:
+    return data.split('\n')
+
+def from_lines(data: list[str]) -> str:
+    return '\n'.join(data)
+
+def number_lines(data: str|list[str]) -> str:
+    """Prepends each line with its line number."""
+    data = to_lines(data) if type(data) is str else data
+    max_i = len(data)
+    for i in range(len(data)):
+        data[i] = f'[{pad_line_no(i, max_i)}]: {data[i]}'
+    return from_lines(data)
+
+def page(data: str|list[str], index: int = 0, offset: int = 0, size: int = 46, linenos: bool = False) -> str:
+    """Given file contents, return a specific page. If linenos=True,
+        each line will have its line number prepended. Intended to be
+        used with `print` on output from `cat`.
+    """
+    data = to_lines(data) if type(data) is str else data
+
+    if index * size + offset < len(data):
+        if len(data) > size * (index + 1) + offset:
+            data = data[size*index+offset:size*(index+1)+offset]
+        else:
+            data = data[size*index+offset:]
+    elif size + offset < len(data):
+        data = data[offset:offset+size]
+    elif size < len(data):
+        data = data = data[:size]
+
+    if linenos:
+        max_i = len(data)
+        for i in range(len(data)):
+            data[i] = f'[{pad_line_no(i, max_i)}]: {data[i]}'
+    return from_lines(data)
+
+def grep(data: str|list[str], search: str|list[str]) -> str:
+    """Searches the given data for the search term[s]. Returns all
+        matched lines; each matching line will be prepended with its
+        line number. Intended to be used with `print` on output from
+        `cat`.
+    """
+    data = to_lines(data) if type(data) is str else data
+    matches = []
+    max_i = len(data) - 1
+
+    for i, line in enumerate(data):
+        if type(search) is str and search in line:
+            matches.append(f'{pad_line_no(i, max_i)}: {line}')
+        elif type(search) is list:
+            for s in search:
+                if s in line:
+                    matches.append(f'{pad_line_no(i, max_i)}: {line}')
+                    break
+
+    return from_lines(matches)
+
+def pad_line_no(i: int, max_i: int) -> str:
+    i = str(i)
+    max_i = str(max_i)
+    while len(max_i) > len(i):
+        i = f'0{i}'
+    return i
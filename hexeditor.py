@@ -1,10 +1,21 @@
 #!/bin/python
 
-from binascii import crc32
-from collections import deque, namedtuple
+from array import array
+from binascii import crc32, hexlify
+from collections import OrderedDict, deque, namedtuple
 from sys import argv
+from time import time
+import sys
 import os
 
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:
+    def ticks_ms() -> int:
+        return int(time() * 1000)
+    def ticks_diff(end: int, start: int) -> int:
+        return end - start
+
 
 """
 ISC License
@@ -39,11 +50,691 @@ def HexEdit_to_bytes(hex_edit: HexEdit) -> bytes:
     val = val + hex_edit.new_bytes
     return val
 
+def HexEdit_from_bytes(data: bytes) -> HexEdit:
+    """Parse the output of HexEdit_to_bytes back into a HexEdit."""
+    start_offset = int.from_bytes(data[1:5], 'big')
+    end_offset = int.from_bytes(data[5:9], 'big')
+    size = int.from_bytes(data[9:13], 'big')
+    old_bytes = bytes(data[13:13+size])
+    i = 13 + size
+    size = int.from_bytes(data[i:i+4], 'big')
+    new_bytes = bytes(data[i+4:i+4+size])
+    return HexEdit(chr(data[0]), start_offset, end_offset, old_bytes, new_bytes)
+
+def HexEdit_size(hex_edit: HexEdit) -> int:
+    """Returns the length of the content stored in an edit."""
+    return len(hex_edit.old_bytes) + len(hex_edit.new_bytes)
+
+
+class EditStack:
+    """A stack of encoded edits that can also be trimmed from the
+        bottom. The records are stored back to back in one bytearray
+        arena, with the start, content size, and revisions of each in
+        parallel arrays, so an entry costs one record and four array
+        slots instead of an edit tuple and its separate objects. Entries
+        head to count are in use; the arena and arrays are compacted
+        once at least half of them have been trimmed from the bottom.
+    """
+    __slots__ = ('arena', 'starts', 'sizes', 'revisions', 'belows', 'head', 'count')
+
+    def __init__(self):
+        self.arena = bytearray()
+        self.starts = array('I')
+        self.sizes = array('I')
+        self.revisions = array('I')
+        # the revision below each undone edit; unused by the applied stack
+        self.belows = array('I')
+        self.head = 0
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count - self.head
+
+    def revision(self) -> int:
+        """Returns the revision of the top entry."""
+        return self.revisions[self.count-1]
+
+    def footprint(self) -> int:
+        """Returns the bytes held by the arena and the arrays."""
+        return len(self.arena) + 16 * len(self.starts)
+
+    def push(self, record: bytes, size: int, revision: int, below: int = 0):
+        i = self.count
+        if i < len(self.starts):
+            self.starts[i] = len(self.arena)
+            self.sizes[i] = size
+            self.revisions[i] = revision
+            self.belows[i] = below
+        else:
+            self.starts.append(len(self.arena))
+            self.sizes.append(size)
+            self.revisions.append(revision)
+            self.belows.append(below)
+        self.arena.extend(record)
+        self.count += 1
+
+    def top(self) -> bytearray:
+        """Returns a copy of the top record."""
+        return self.arena[self.starts[self.count-1]:]
+
+    def bottom(self) -> bytearray:
+        """Returns a copy of the bottom record."""
+        i = self.head
+        return self.arena[self.starts[i]:self.starts[i+1] if i + 1 < self.count else len(self.arena)]
+
+    def pop(self) -> tuple[int, int, int]:
+        """Remove the top entry and return its content size, revision,
+            and revision below.
+        """
+        self.count -= 1
+        i = self.count
+        self.arena[self.starts[i]:] = b''
+        if self.count == self.head:
+            self._clear()
+        return self.sizes[i], self.revisions[i], self.belows[i]
+
+    def popleft(self) -> tuple[int, int, int]:
+        """Remove the bottom entry and return its content size,
+            revision, and revision below.
+        """
+        i = self.head
+        self.head += 1
+        entry = self.sizes[i], self.revisions[i], self.belows[i]
+        if self.head == self.count:
+            self._clear()
+        elif 2 * self.head >= self.count:
+            self._compact()
+        return entry
+
+    def _clear(self):
+        # a new arena, as shrinking one may keep its allocation
+        self.arena = bytearray()
+        self.head = self.count = 0
+
+    def _compact(self):
+        """Move the entries in use to the front of the arena and arrays."""
+        head = self.head
+        shift = self.starts[head]
+        self.arena[:shift] = b''
+        for i in range(head, self.count):
+            self.starts[i-head] = self.starts[i] - shift
+            self.sizes[i-head] = self.sizes[i]
+            self.revisions[i-head] = self.revisions[i]
+            self.belows[i-head] = self.belows[i]
+        self.count -= head
+        self.head = 0
+
+
+class History:
+    """Applied and undone edit stacks with O(1) unsaved edit tracking.
+        Every state of the applied stack gets its own revision number,
+        and the revision at the last write is remembered, so checking
+        for unsaved edits is a single comparison. Undoing back to the
+        written state counts as clean, as does redoing back to it.
+
+        The history is bounded by both an entry count (size) and the
+        total bytes of old and new content stored in its edits
+        (max_bytes). When a limit is exceeded, the oldest applied edits
+        are dropped, or, if spill_path is set, appended to a spill file
+        and paged back in when undo reaches them; undone edits are
+        dropped if the applied edits alone cannot be trimmed enough. An
+        edit too large for max_bytes on its own is spilled as well, or,
+        without spill_path, dropped at once and counted in unrecorded,
+        since it cannot be undone. Call close() to delete the spill file.
+
+        Edits are stored encoded in an EditStack for each direction and
+        are only parsed back into HexEdit objects when popped to be undone
+        or redone.
+    """
+    __slots__ = ('size', 'applied', 'undone', 'next_revision', 'base_revision', 'saved_revision', 'popped',
+                 'max_bytes', 'bytes', 'spill_path', 'spill', 'unrecorded')
+
+    def __init__(self, size: int = 100, max_bytes: int = 16384, spill_path: str = None):
+        self.size = size
+        # each applied edit is stored with the revision after it, and
+        # each undone edit with that revision and the one below it
+        self.applied = EditStack()
+        self.undone = EditStack()
+        self.next_revision = 1
+        self.base_revision = 0
+        self.saved_revision = 0
+        self.popped = None
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.spill_path = spill_path
+        # the Spill from editor_spill, imported on the first spill
+        self.spill = None
+        self.unrecorded = 0
+
+    def revision(self) -> int:
+        """Returns the revision of the current state."""
+        return self.applied.revision() if len(self.applied) else self.base_revision
+
+    def _push(self, ed: HexEdit, revision: int) -> bytes:
+        record = HexEdit_to_bytes(ed)
+        size = HexEdit_size(ed)
+        self.applied.push(record, size, revision)
+        self.bytes += size
+        self._trim()
+        return record
+
+    def _spilled(self) -> int:
+        return len(self.spill) if self.spill is not None else 0
+
+    def _trim(self):
+        """Drop or spill the oldest edits until both limits are met."""
+        while len(self.applied) > self.size or (self.bytes > self.max_bytes and len(self.applied) > 1):
+            self._drop_oldest()
+        while len(self.undone) and (len(self.undone) > self.size or self.bytes > self.max_bytes):
+            self.bytes -= self.undone.popleft()[0]
+        if self.bytes > self.max_bytes and len(self.applied):
+            # the newest edit alone is over the limit
+            if not self.spill_path:
+                self.unrecorded += 1
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        """Drop the oldest applied edit, or move it to the spill file."""
+        record = self.applied.bottom() if self.spill_path else None
+        size, self.base_revision, _ = self.applied.popleft()
+        self.bytes -= size
+        if record is not None:
+            self._spill_out(record, size, self.base_revision)
+
+    def _spill_out(self, record: bytes, size: int, revision: int):
+        if self.spill is None:
+            from editor_spill import Spill
+            self.spill = Spill(self.spill_path)
+        self.spill.push(record, size, revision)
+
+    def _spill_in(self):
+        """Page the most recently spilled edit back into the applied
+            stack, which is empty when undo reaches the spill file.
+        """
+        record, size, revision = self.spill.pop()
+        self.applied.push(record, size, revision)
+        self.bytes += size
+        self.base_revision = self.spill.revision()
+
+    def record(self, ed: HexEdit) -> bytes:
+        """Record a newly applied edit. Returns its encoding, as written
+            by HexEdit_to_bytes.
+        """
+        record = self._push(ed, self.next_revision)
+        self.next_revision += 1
+        return record
+
+    def pop_applied(self) -> HexEdit|None:
+        """Pop the last applied edit in order to undo it. Call
+            push_undone once it has been undone.
+        """
+        if not len(self.applied) and self._spilled():
+            self._spill_in()
+        if not len(self.applied):
+            return None
+        ed = HexEdit_from_bytes(self.applied.top())
+        size, self.popped, _ = self.applied.pop()
+        self.bytes -= size
+        return ed
+
+    def push_undone(self, ed: HexEdit):
+        size = HexEdit_size(ed)
+        self.undone.push(HexEdit_to_bytes(ed), size, self.popped, self.revision())
+        self.bytes += size
+        self._trim()
+
+    def pop_undone(self) -> HexEdit|None:
+        """Pop the last undone edit in order to redo it. Call
+            push_redone once it has been redone.
+        """
+        if not len(self.undone):
+            return None
+        ed = HexEdit_from_bytes(self.undone.top())
+        size, revision, below = self.undone.pop()
+        self.popped = (revision, below)
+        self.bytes -= size
+        return ed
+
+    def push_redone(self, ed: HexEdit):
+        revision, below = self.popped
+        if below != self.revision():
+            # redone on top of different edits, so this is a new state
+            revision = self.next_revision
+            self.next_revision += 1
+        self._push(ed, revision)
+
+    def top_record(self, undone: bool = False) -> bytearray|None:
+        """Returns the encoding of the edit that pop_applied (or, if
+            undone is True, pop_undone) would return next, or None.
+        """
+        if undone:
+            return self.undone.top() if len(self.undone) else None
+        if not len(self.applied) and self._spilled():
+            self._spill_in()
+        return self.applied.top() if len(self.applied) else None
+
+    def mark_saved(self):
+        """Mark the current state as written to the file."""
+        self.saved_revision = self.revision()
+
+    def is_dirty(self) -> bool:
+        """Returns True if the current state has not been written."""
+        return self.revision() != self.saved_revision
+
+    def entry_overhead(self) -> int:
+        """Returns the bytes the stacks hold per entry beyond the edit
+            content itself, or 0 if there are no entries.
+        """
+        entries = len(self.applied) + len(self.undone)
+        if not entries:
+            return 0
+        return (self.applied.footprint() + self.undone.footprint() - self.bytes) // entries
+
+    def status(self) -> str:
+        """Returns a summary of the history's size for the status line."""
+        status = f'History: {len(self.applied)} applied, {len(self.undone)} undone, ' + \
+            f'{self.bytes}/{self.max_bytes} bytes'
+        if self._spilled():
+            status = f'{status}, {self._spilled()} spilled'
+        return status
+
+    def close(self):
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+
+class PieceTable:
+    """Piece table backing store for binary data. The original data is
+        never modified; inserted bytes are appended to an add buffer,
+        and the current contents are described by a list of pieces of
+        the form (source, start, length), where source 0 is the
+        original data and source 1 is the add buffer. Edits cost
+        O(pieces) instead of O(file size).
+    """
+    __slots__ = ('original', 'added', 'pieces', 'length')
+
+    def __init__(self, original: bytes = b''):
+        self.original = original
+        self.added = bytearray()
+        self.pieces = [(0, 0, len(original))] if len(original) else []
+        self.length = len(original)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, key: int|slice) -> int|bytearray:
+        if type(key) is slice:
+            start, stop, _ = key.indices(self.length)
+            return self.read(start, stop)
+        if key < 0:
+            key += self.length
+        if key < 0 or key >= self.length:
+            raise IndexError('PieceTable index out of range')
+        return self.read(key, key + 1)[0]
+
+    def _source(self, src: int) -> bytes|bytearray:
+        return self.added if src else self.original
+
+    def _split(self, offset: int) -> int:
+        """Ensure a piece boundary exists at offset. Returns the index
+            of the piece that starts at offset (or len(pieces) if the
+            offset is the end of the data).
+        """
+        pos = 0
+        for i in range(len(self.pieces)):
+            src, start, length = self.pieces[i]
+            if offset == pos:
+                return i
+            if offset < pos + length:
+                within = offset - pos
+                self.pieces[i] = (src, start, within)
+                self.pieces.insert(i + 1, (src, start + within, length - within))
+                return i + 1
+            pos += length
+        return len(self.pieces)
+
+    def chunks(self, start: int = 0, stop: int = None):
+        """Yield memoryview slices covering bytes start through stop.
+            Do not modify the table while iterating.
+        """
+        stop = self.length if stop is None else min(stop, self.length)
+        pos = 0
+        for src, p_start, length in self.pieces:
+            if pos >= stop:
+                break
+            if pos + length > start:
+                lo = p_start + max(start - pos, 0)
+                hi = p_start + min(stop - pos, length)
+                source = self._source(src)
+                if type(source) in (bytes, bytearray):
+                    yield memoryview(source)[lo:hi]
+                else:
+                    for block in source.blocks(lo, hi):
+                        yield block
+            pos += length
+
+    def read(self, start: int, stop: int) -> bytearray:
+        """Read bytes start through stop into a new bytearray."""
+        buf = bytearray()
+        for chunk in self.chunks(start, stop):
+            buf.extend(chunk)
+        return buf
+
+    def find(self, pattern: bytes, start: int = 0, block_size: int = 4096) -> int:
+        """Return the offset of the first occurrence of pattern at or
+            after start, or -1. The data is searched in blocks of
+            block_size bytes that overlap by len(pattern) - 1 bytes, so
+            only one block is read into memory at a time.
+        """
+        size = len(pattern)
+        start = max(start, 0)
+        while start + size <= self.length:
+            i = bytes(self.read(start, start + block_size + size - 1)).find(pattern)
+            if i >= 0:
+                return start + i
+            start += block_size
+        return -1
+
+    def rfind(self, pattern: bytes, stop: int = None, block_size: int = 4096) -> int:
+        """Return the offset of the last occurrence of pattern that ends
+            at or before stop, or -1. The data is searched backwards in
+            overlapping blocks like find.
+        """
+        size = len(pattern)
+        stop = self.length if stop is None else min(stop, self.length)
+        while stop >= size:
+            start = max(stop - block_size - size + 1, 0)
+            i = bytes(self.read(start, stop)).rfind(pattern)
+            if i >= 0:
+                return start + i
+            if start == 0:
+                break
+            stop = start + size - 1
+        return -1
 
-def bat(fname: str) -> bytes:
-    """Returns the bytes contents of a file. Similar to cat."""
-    with open(fname, 'rb') as f:
-        return f.read()
+    def insert(self, offset: int, data: bytes):
+        """Insert data at the given offset."""
+        if not data:
+            return
+        offset = min(offset, self.length)
+        i = self._split(offset)
+        add_start = len(self.added)
+        self.added.extend(data)
+        prev = self.pieces[i-1] if i else None
+        if prev and prev[0] == 1 and prev[1] + prev[2] == add_start:
+            # extend the previous piece if it ends at the add buffer tail
+            self.pieces[i-1] = (1, prev[1], prev[2] + len(data))
+        else:
+            self.pieces.insert(i, (1, add_start, len(data)))
+        self.length += len(data)
+
+    def append(self, data: bytes):
+        """Append data to the end."""
+        self.insert(self.length, data)
+
+    def delete(self, start: int, stop: int):
+        """Delete bytes start through stop."""
+        stop = min(stop, self.length)
+        if start >= stop:
+            return
+        i = self._split(start)
+        j = self._split(stop)
+        del self.pieces[i:j]
+        self.length -= stop - start
+
+    def replace(self, start: int, stop: int, data: bytes):
+        """Replace bytes start through stop with data."""
+        self.delete(start, stop)
+        self.insert(start, data)
+
+
+class Screen:
+    """Terminal renderer. With ansi=True, it keeps the previously drawn
+        frame and uses ANSI cursor addressing to redraw only the lines
+        that changed; line wrapping is disabled while drawing, so each
+        line of a frame occupies exactly one row. With ansi=False, it
+        clears the screen and prints the whole frame every time. Either
+        way, each redraw is composed in memory and sent to the terminal
+        with a single write. If count_bytes=True, the number of bytes
+        sent by the last redraw is kept in last_bytes.
+
+        Rows past the bottom of the terminal cannot be addressed, so a
+        frame that does not fit above the prompt is printed in full and
+        left to scroll instead. The height is rows, if set, or else the
+        terminal's size where os.get_terminal_size can tell it (not on
+        MicroPython, where an unknown height is assumed to fit).
+    """
+    __slots__ = ('ansi', 'frame', 'count_bytes', 'last_bytes', 'total_bytes', 'rows')
+
+    def __init__(self, ansi: bool = True, count_bytes: bool = False, rows: int = None):
+        self.ansi = ansi
+        self.frame = None
+        self.rows = rows
+        self.count_bytes = count_bytes
+        self.last_bytes = 0
+        self.total_bytes = 0
+
+    def invalidate(self):
+        """Force the next draw to redraw the whole frame."""
+        self.frame = None
+
+    def height(self) -> int|None:
+        """Returns the terminal height, or None if it is unknown."""
+        if self.rows:
+            return self.rows
+        if hasattr(os, 'get_terminal_size'):
+            try:
+                return os.get_terminal_size().lines
+            except OSError:
+                ...
+        return None
+
+    def draw(self, lines: list[str]):
+        buf = []
+        rows = self.height() if self.ansi else None
+        if rows and len(lines) + 2 > rows:
+            # the frame, the prompt, and the line typed at it would run
+            # past the bottom row, which cursor addressing cannot reach
+            buf.append('\x1b[2J\x1b[H')
+            buf.append('\n'.join(lines))
+            buf.append('\n')
+            self.frame = None
+        elif not self.ansi:
+            if hasattr(os, 'system') and hasattr(os, 'name'):
+                try:
+                    os.system('cls' if os.name == 'nt' else 'clear')
+                except:
+                    ...
+            buf.append('\n'.join(lines))
+            buf.append('\n')
+        else:
+            buf.append('\x1b[?7l')
+            if self.frame is None:
+                buf.append('\x1b[2J')
+                self.frame = []
+            for row in range(len(lines)):
+                if row >= len(self.frame) or self.frame[row] != lines[row]:
+                    buf.append(f'\x1b[{row+1};1H{lines[row]}\x1b[K')
+            # clear the old prompt, typed input, and any rows left over
+            # from a longer previous frame
+            buf.append(f'\x1b[{len(lines)+1};1H\x1b[J\x1b[?7h')
+            self.frame = lines
+
+        text = ''.join(buf)
+        sys.stdout.write(text)
+        if hasattr(sys.stdout, 'flush'):
+            sys.stdout.flush()
+        if self.count_bytes:
+            self.last_bytes = len(text.encode())
+            self.total_bytes += self.last_bytes
+
+
+class RowCache:
+    """LRU cache of formatted hex rows keyed by (start_offset,
+        bytes_per_line). The total length of the cached rows is capped
+        at max_size characters, and the least recently used rows are
+        evicted first. Rows are cleared when the offset column width
+        changes.
+    """
+    __slots__ = ('rows', 'max_size', 'size', 'width')
+
+    def __init__(self, max_size: int = 16384):
+        self.rows = OrderedDict()
+        self.max_size = max_size
+        self.size = 0
+        self.width = 0
+
+    def get(self, key: tuple[int, int]) -> str|None:
+        row = self.rows.pop(key, None)
+        if row is not None:
+            self.rows[key] = row
+        return row
+
+    def put(self, key: tuple[int, int], row: str):
+        old = self.rows.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self.rows[key] = row
+        self.size += len(row)
+        while self.size > self.max_size and self.rows:
+            self.size -= len(self.rows.pop(next(iter(self.rows))))
+
+    def set_width(self, max_offset: int):
+        """Clear the cache if the width of the offset column changed."""
+        width = len(str(max_offset))
+        if width != self.width:
+            self.clear()
+            self.width = width
+
+    def invalidate_range(self, start: int, stop: int):
+        """Drop the rows that overlap bytes start through stop, e.g.
+            after a same-length replace.
+        """
+        for key in [k for k in self.rows if k[0] < stop and k[0] + k[1] > start]:
+            self.size -= len(self.rows.pop(key))
+
+    def invalidate_from(self, offset: int):
+        """Drop the rows at or after offset, e.g. after an insert or
+            delete shifted the bytes that follow it.
+        """
+        for key in [k for k in self.rows if k[0] + k[1] > offset]:
+            self.size -= len(self.rows.pop(key))
+
+    def clear(self):
+        self.rows = OrderedDict()
+        self.size = 0
+
+
+class DirtyRanges:
+    """Sorted, merged list of the (start, stop) byte ranges changed
+        since the file was last written. Edits that change the length of
+        the data shift every byte after them, so they set resized
+        instead, and the file must then be rewritten in full.
+    """
+    __slots__ = ('ranges', 'resized')
+
+    def __init__(self):
+        self.ranges = []
+        self.resized = False
+
+    def record(self, ed: HexEdit):
+        """Mark the bytes touched by an applied or undone edit."""
+        if ed.command == 'e' and len(ed.old_bytes) == len(ed.new_bytes):
+            self.add(ed.start_offset, ed.start_offset + len(ed.new_bytes))
+        else:
+            self.resized = True
+
+    def add(self, start: int, stop: int):
+        ranges = []
+        for lo, hi in self.ranges:
+            if hi < start or lo > stop:
+                ranges.append((lo, hi))
+            else:
+                start, stop = min(lo, start), max(hi, stop)
+        ranges.append((start, stop))
+        ranges.sort()
+        self.ranges = ranges
+
+    def aligned(self, block_size: int, length: int) -> list[tuple[int, int]]:
+        """Return the ranges widened to multiples of block_size (capped
+            at length) and merged; block_size=0 returns them as is.
+        """
+        if not block_size:
+            return self.ranges
+        ranges = []
+        for lo, hi in self.ranges:
+            lo = lo // block_size * block_size
+            hi = min(-(-hi // block_size) * block_size, length)
+            if ranges and lo <= ranges[-1][1]:
+                ranges[-1] = (ranges[-1][0], max(ranges[-1][1], hi))
+            else:
+                ranges.append((lo, hi))
+        return ranges
+
+    def clear(self):
+        self.ranges = []
+        self.resized = False
+
+
+def sync_file(f):
+    """Flush a file and make sure its contents have reached storage."""
+    f.flush()
+    if hasattr(os, 'fsync'):
+        os.fsync(f.fileno())
+    elif hasattr(os, 'sync'):
+        os.sync()
+
+def replace_file(src: str, dst: str):
+    """Rename src over dst. os.rename cannot overwrite an existing file
+        on Windows, so os.replace is used where it exists; MicroPython
+        only has os.rename, which overwrites.
+    """
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        os.rename(src, dst)
+
+def file_size(fpath: str) -> int:
+    try:
+        return os.stat(fpath)[6]
+    except OSError:
+        return 0
+
+def file_crc(fpath: str, chunk_size: int = 1024) -> int:
+    """Returns the CRC32 of a file's contents, read in chunks of
+        chunk_size bytes, or 0 if it cannot be read.
+    """
+    crc = 0
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    try:
+        with open(fpath, 'rb') as f:
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                crc = crc32(view[:n], crc)
+    except OSError:
+        ...
+    return crc
+
+
+# the module each optional part of the hex editor lives in
+_LAZY = {
+    'bat': 'editor_utils', 'FileReader': 'editor_reader', 'Journal': 'editor_journal',
+    'read_journal': 'editor_journal', 'Profiler': 'editor_profile', 'Spill': 'editor_spill',
+}
+
+def __getattr__(name: str):
+    """Import bat and the optional parts of the hex editor (lazy
+        loading, the journal, the profiler, and the history spill file)
+        from their modules on first use, so that importing the hex
+        editor does not compile them.
+    """
+    if name in _LAZY:
+        return getattr(__import__(_LAZY[name]), name)
+    raise AttributeError(f"module 'hexeditor' has no attribute '{name}'")
 
 def read_binary_file(fpath: str) -> bytes:
     """Read a file as binary data."""
@@ -53,10 +744,54 @@ def read_binary_file(fpath: str) -> bytes:
     except:
         return b''
 
-def write_binary_file(fpath: str, data: bytes):
-    """Write binary data to a file."""
-    with open(fpath, 'wb') as f:
-        f.write(data)
+# the size of the buffer a save writes through, which bounds the memory
+# it needs beyond the edited data
+WRITE_CHUNK_SIZE = 4096
+
+def write_binary_file(fpath: str, data: bytes|PieceTable,
+                      chunk_size: int = WRITE_CHUNK_SIZE, replace: bool = True) -> int:
+    """Write binary data to a file. A PieceTable is written piece by
+        piece without being joined in memory first, in writes of at most
+        chunk_size bytes. The data goes to a temporary file that is then
+        synced and renamed over fpath, so a reset during the write
+        leaves the original file intact. If replace is False, the
+        synced temporary file is left at fpath + '.tmp' for the caller
+        to replace fpath with, e.g. once a FileReader reading fpath has
+        been closed. Returns the number of bytes written.
+    """
+    tmp_path = f'{fpath}.tmp'
+    chunks = data.chunks() if type(data) is PieceTable else (data,)
+    written = 0
+    with open(tmp_path, 'wb') as f:
+        for chunk in chunks:
+            view = memoryview(chunk)
+            for i in range(0, len(view), chunk_size):
+                f.write(view[i:i+chunk_size])
+            written += len(view)
+        sync_file(f)
+    if replace:
+        replace_file(tmp_path, fpath)
+    return written
+
+def write_binary_ranges(fpath: str, data: PieceTable, ranges: list[tuple[int, int]],
+                        chunk_size: int = WRITE_CHUNK_SIZE) -> int:
+    """Write only the given (start, stop) byte ranges of data into fpath
+        in place, for edits that did not change the length of the file.
+        Unlike write_binary_file this is not atomic, but only the
+        changed regions of the file are rewritten. Returns the number of
+        bytes written.
+    """
+    written = 0
+    with open(fpath, 'r+b') as f:
+        for start, stop in ranges:
+            f.seek(start)
+            for chunk in data.chunks(start, stop):
+                view = memoryview(chunk)
+                for i in range(0, len(view), chunk_size):
+                    f.write(view[i:i+chunk_size])
+                written += len(view)
+        sync_file(f)
+    return written
 
 def parse_hex_input(hex_str: str) -> bytes:
     """Parse hex digits (e.g., "FF00AB") into bytes. Returns bytes
@@ -71,27 +806,60 @@ def parse_hex_input(hex_str: str) -> bytes:
         raise ValueError('Invalid hex string: must be even length')
     return bytes.fromhex(hex_str)
 
+def parse_search_input(term: str) -> bytes:
+    """Parse a search term: text in single or double quotes is searched
+        for as ASCII, and anything else is parsed as hex digits with
+        parse_hex_input.
+    """
+    term = term.strip()
+    if term[:1] in ('"', "'"):
+        if len(term) > 1 and term[-1] == term[0]:
+            term = term[1:-1]
+        else:
+            term = term[1:]
+        return term.encode()
+    return parse_hex_input(term)
+
 def pad_offset(offset: int, max_offset: int) -> str:
     """Pad offset numbers similar to pad_line_no."""
     offset_str = str(offset)
-    max_str = str(max_offset)
-    while len(max_str) > len(offset_str):
-        offset_str = f'0{offset_str}'
-    return offset_str
+    return '0' * (len(str(max_offset)) - len(offset_str)) + offset_str
 
-def format_hex_line(offset: int, data: bytes, bytes_per_line: int, max_offset: int) -> str:
+# Lookup table for the ASCII column: printable chars or dots
+_ASCII_TABLE = ''.join([chr(b) if 32 <= b < 127 else '.' for b in range(256)])
+
+def format_hex_line(offset: int, data: bytes|memoryview, bytes_per_line: int, max_offset: int) -> str:
     """Format one hex line as [offset]: XX XX ... | ASCII"""
     line_data = data[:bytes_per_line]
-    hex_part = ' '.join([f'{b:02X}' for b in line_data])
+    hex_part = hexlify(line_data, ' ').decode().upper() if len(line_data) else ''
     # Pad hex_part to ensure consistent width
-    hex_part = hex_part.ljust(bytes_per_line * 3 - 1)
+    hex_part = hex_part + ' ' * (bytes_per_line * 3 - 1 - len(hex_part))
 
-    # ASCII representation: printable chars or dots
-    ascii_part = ''.join([chr(b) if 32 <= b < 127 else '.' for b in line_data])
+    ascii_part = ''.join([_ASCII_TABLE[b] for b in line_data])
 
     offset_str = pad_offset(offset, max_offset)
     return f'[{offset_str}]: {hex_part} | {ascii_part}'
 
+def highlight_hex_line(line: str, offset: int, bytes_per_line: int, max_offset: int,
+                       start: int, stop: int) -> str:
+    """Highlight bytes start through stop of a line formatted by
+        format_hex_line, in both the hex and ASCII columns, using ANSI
+        reverse video. Lines that do not overlap the range are returned
+        unchanged.
+    """
+    lo = max(start - offset, 0)
+    hi = min(stop - offset, bytes_per_line)
+    if lo >= hi:
+        return line
+    prefix = len(str(max_offset)) + 4
+    ascii_start = prefix + bytes_per_line * 3 + 2
+    spans = ((prefix + lo * 3, prefix + hi * 3 - 1), (ascii_start + lo, ascii_start + hi))
+    if len(line) < spans[1][1]:
+        return line
+    return line[:spans[0][0]] + '\x1b[7m' + line[spans[0][0]:spans[0][1]] + '\x1b[0m' + \
+        line[spans[0][1]:spans[1][0]] + '\x1b[7m' + line[spans[1][0]:spans[1][1]] + '\x1b[0m' + \
+        line[spans[1][1]:]
+
 def format_hex_header(bytes_per_line: int, max_offset: int) -> str:
     """Generate a header row with column numbers 1 through bytes_per_line.
     The header aligns with the hex bytes portion of each line.
@@ -101,400 +869,866 @@ def format_hex_header(bytes_per_line: int, max_offset: int) -> str:
     column_numbers = ' '.join([f'{i:>2}' for i in range(bytes_per_line)])
     return f'{offset_placeholder}{column_numbers}'
 
-def format_hex_display(data: bytes, start_byte: int, bytes_per_line: int, page_size: int) -> list[str]:
-    """Generate a list of hex lines for display starting from start_byte."""
+def format_hex_display(data: bytes|PieceTable, start_byte: int, bytes_per_line: int, page_size: int,
+                       cache: RowCache = None) -> list[str]:
+    """Generate a list of hex lines for display starting from start_byte.
+        Only the bytes for the page are read, and each line is a
+        memoryview slice of them rather than a copy. If a RowCache is
+        supplied, cached rows are reused and the page is only read if
+        some row is missing from the cache.
+    """
     lines = []
-    max_offset = len(data) - 1 if len(data) > 0 else 0
     total_bytes = len(data)
-
-    byte_offset = start_byte
-    for i in range(page_size):
-        if byte_offset >= total_bytes:
-            break
-
-        line_data = data[byte_offset:byte_offset + bytes_per_line]
-        lines.append(format_hex_line(byte_offset, line_data, bytes_per_line, max_offset))
-        byte_offset += bytes_per_line
+    max_offset = total_bytes - 1 if total_bytes > 0 else 0
+    stop_byte = min(start_byte + page_size * bytes_per_line, total_bytes)
+    if start_byte >= stop_byte:
+        return lines
+    if cache is not None:
+        cache.set_width(max_offset)
+
+    page_data = None
+    for pos in range(0, stop_byte - start_byte, bytes_per_line):
+        key = (start_byte + pos, bytes_per_line)
+        line = cache.get(key) if cache is not None else None
+        if line is None:
+            if page_data is None:
+                if type(data) in (bytes, bytearray, memoryview):
+                    page_data = memoryview(data)[start_byte:stop_byte]
+                else:
+                    page_data = memoryview(data[start_byte:stop_byte])
+            line_data = page_data[pos:pos + bytes_per_line]
+            line = format_hex_line(start_byte + pos, line_data, bytes_per_line, max_offset)
+            if cache is not None:
+                cache.put(key, line)
+        lines.append(line)
 
     return lines
 
-def hex_checksum(edit_buffer: deque[HexEdit] = None, data: bytes = None) -> int:
+def hex_checksum(edit_buffer: deque[HexEdit] = None, data: bytes|PieceTable = None) -> int:
     """Calculate a checksum for hex edit buffer and/or binary data."""
     val = 0
     if edit_buffer:
         for i in range(len(edit_buffer)):
             val = crc32(HexEdit_to_bytes(edit_buffer[i]), val)
     if data:
-        val = crc32(data, val)
+        if type(data) is PieceTable:
+            for chunk in data.chunks():
+                val = crc32(chunk, val)
+        else:
+            val = crc32(data, val)
     return val
 
-def hexedit(fpath: str, page_size: int = 35, bytes_per_line: int = 40, history_buffer_size: int = 100):
-    """Edit a binary file in hex mode. This is the main function for hex editing."""
-    applied_edits: deque[HexEdit] = deque([], history_buffer_size)
-    undone_edits: deque[HexEdit] = deque([], history_buffer_size)
-    original_bytes_per_line = bytes_per_line
-
-    def undo():
-        if not len(applied_edits):
+def open_piece_table(fpath: str, lazy: bool = False) -> PieceTable:
+    """Open a file as a PieceTable. If lazy=True, the file is read on
+        demand through a FileReader (from editor_reader) instead of
+        being loaded into memory.
+    """
+    if lazy:
+        try:
+            from editor_reader import FileReader
+            return PieceTable(FileReader(fpath))
+        except OSError:
+            ...
+    return PieceTable(read_binary_file(fpath))
+
+class HexBuffer:
+    """Headless editing engine for a binary file: the piece table, the
+        edit history, the row cache, the changed ranges, and the
+        optional journal, with a method for each editing command.
+        hexedit() is an interactive front-end for it, and it can also be
+        driven directly from code. Invalid offsets and empty input raise
+        ValueError. See hexedit for the parameters.
+    """
+    __slots__ = ('fpath', 'lazy', 'data', 'history', 'log', 'row_cache', 'dirty')
+
+    def __init__(self, fpath: str, lazy: bool = False, history_buffer_size: int = 100,
+                 history_buffer_bytes: int = 16384, history_spill_path: str = None, journal: bool = False,
+                 journal_flush_records: int = 8, journal_flush_interval: int = 5, row_cache_size: int = 16384):
+        self.fpath = fpath
+        self.lazy = lazy
+        self.data = open_piece_table(fpath, lazy)
+        self.history = History(history_buffer_size, history_buffer_bytes, history_spill_path)
+        self.log = None
+        if journal:
+            from editor_journal import Journal
+            self.log = Journal(f'{fpath}.journal', journal_flush_records, journal_flush_interval)
+        self.row_cache = RowCache(row_cache_size) if row_cache_size else None
+        self.dirty = DirtyRanges()
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def _invalidate_rows(self, ed: HexEdit):
+        """Drop the cached rows that an applied or undone edit touched."""
+        if self.row_cache is None:
             return
-        ed = applied_edits.pop()
+        if ed.command == 'e' and len(ed.old_bytes) == len(ed.new_bytes):
+            self.row_cache.invalidate_range(ed.start_offset, ed.start_offset + len(ed.new_bytes))
+        else:
+            self.row_cache.invalidate_from(max(0, min(ed.start_offset, len(self.data) - len(ed.new_bytes))))
+
+    def apply(self, ed: HexEdit):
+        """Apply a new edit to the data and record it."""
+        data = self.data
+        if ed.command == 'e':
+            data.replace(ed.start_offset, ed.end_offset, ed.new_bytes)
+        elif ed.command == 'd':
+            data.delete(ed.start_offset, ed.end_offset)
+        elif ed.command == 'i':
+            data.insert(ed.start_offset, ed.new_bytes)
+        elif ed.command == 'a':
+            data.append(ed.new_bytes)
+        record = self.history.record(ed)
+        self._invalidate_rows(ed)
+        self.dirty.record(ed)
+        if self.log:
+            self.log.write('A', record)
+
+    def _check(self, offset: int, stop: int):
+        if offset < 0 or offset >= stop:
+            raise ValueError(f'Offset {offset} is beyond end of file (length: {len(self.data)})')
+
+    def replace(self, offset: int, new_bytes: bytes):
+        """Replace len(new_bytes) bytes at offset, or up to the end of
+            the data, with new_bytes.
+        """
+        self._check(offset, len(self.data))
+        if not new_bytes:
+            raise ValueError('Cannot replace with zero bytes (use delete instead)')
+        # store end_offset as the original end (before the edit) for undo/redo
+        end_offset = min(offset + len(new_bytes), len(self.data))
+        old_bytes = bytes(self.data[offset:end_offset])
+        self.apply(HexEdit('e', offset, end_offset, old_bytes, bytes(new_bytes)))
+
+    def delete(self, offset: int, count: int = 1):
+        self._check(offset, len(self.data))
+        if count <= 0:
+            raise ValueError('Count must be positive')
+        end_offset = min(offset + count, len(self.data))
+        old_bytes = bytes(self.data[offset:end_offset])
+        self.apply(HexEdit('d', offset, end_offset, old_bytes, b''))
+
+    def insert(self, offset: int, new_bytes: bytes):
+        self._check(offset, len(self.data) + 1)
+        if not new_bytes:
+            raise ValueError('Cannot insert zero bytes')
+        self.apply(HexEdit('i', offset, offset, b'', bytes(new_bytes)))
+
+    def append(self, new_bytes: bytes):
+        if not new_bytes:
+            raise ValueError('Cannot append zero bytes')
+        start_pos = len(self.data)
+        self.apply(HexEdit('a', start_pos, start_pos, b'', bytes(new_bytes)))
+
+    def _inverse(self, ed: HexEdit) -> HexEdit:
+        """Returns the edit that reverts ed when applied."""
+        if ed.command == 'e':
+            return HexEdit('e', ed.start_offset, ed.start_offset + len(ed.new_bytes), ed.new_bytes, ed.old_bytes)
+        if ed.command == 'd':
+            return HexEdit('i', ed.start_offset, ed.start_offset, b'', ed.old_bytes)
+        # undo removes appended bytes from the end, wherever that now is
+        start = len(self.data) - len(ed.new_bytes) if ed.command == 'a' else ed.start_offset
+        return HexEdit('d', start, start + len(ed.new_bytes), ed.new_bytes, b'')
+
+    def undo(self) -> bool:
+        """Undo the last applied edit. Returns False if there was none
+            or the data no longer matches it.
+        """
+        ed = self.history.pop_applied()
+        done = ed is not None and self._undo(ed)
+        if self.log:
+            # the record holds the edit, so that it can be replayed even
+            # if the edit was made before the journal was started
+            self.log.write('U', HexEdit_to_bytes(ed) if done else b'')
+        return done
+
+    def _undo(self, ed: HexEdit) -> bool:
+        """Revert ed and push it onto the undone stack. Returns False
+            if the data no longer matches it.
+        """
+        data = self.data
         if ed.command == 'e':
             # Replace: restore old_bytes
             if ed.start_offset >= len(data):
-                return
+                return False
             # Check if current state matches what we expect
             # After replace, the data at start_offset should be new_bytes
             current_end = min(ed.start_offset + len(ed.new_bytes), len(data))
             current_bytes = bytes(data[ed.start_offset:current_end])
             if current_bytes != ed.new_bytes:
-                return
-            # Restore old_bytes - always reconstruct since lengths may differ
-            new_data = data[:ed.start_offset] + ed.old_bytes + data[current_end:]
-            data.clear()
-            data.extend(new_data)
+                return False
+            # Restore old_bytes; lengths may differ
+            data.replace(ed.start_offset, current_end, ed.old_bytes)
         elif ed.command == 'd':
             # Delete: restore old_bytes
             if ed.start_offset > len(data):
-                data.extend(ed.old_bytes)
+                data.append(ed.old_bytes)
             else:
                 # Insert old_bytes back at start_offset
-                new_data = data[:ed.start_offset] + ed.old_bytes + data[ed.start_offset:]
-                data.clear()
-                data.extend(new_data)
+                data.insert(ed.start_offset, ed.old_bytes)
         elif ed.command == 'i':
             # Insert: remove new_bytes
             if ed.start_offset >= len(data) or data[ed.start_offset:ed.start_offset+len(ed.new_bytes)] != ed.new_bytes:
-                return
-            new_data = data[:ed.start_offset] + data[ed.start_offset+len(ed.new_bytes):]
-            data.clear()
-            data.extend(new_data)
+                return False
+            data.delete(ed.start_offset, ed.start_offset + len(ed.new_bytes))
         elif ed.command == 'a':
             # Append: remove new_bytes from end
             if len(data) < len(ed.new_bytes) or data[-len(ed.new_bytes):] != ed.new_bytes:
-                return
-            new_data = data[:-len(ed.new_bytes)]
-            data.clear()
-            data.extend(new_data)
-        undone_edits.append(ed)
-
-    def redo():
-        if not len(undone_edits):
-            return
-        ed = undone_edits.pop()
+                return False
+            data.delete(len(data) - len(ed.new_bytes), len(data))
+        self._invalidate_rows(ed)
+        self.dirty.record(ed)
+        self.history.push_undone(ed)
+        return True
+
+    def redo(self) -> bool:
+        """Redo the last undone edit. Returns False if there was none
+            or the data no longer matches it.
+        """
+        ed = self.history.pop_undone()
+        done = ed is not None and self._redo(ed)
+        if self.log:
+            # the record holds the edit, so that it can be replayed even
+            # if the edit was made before the journal was started
+            self.log.write('R', HexEdit_to_bytes(ed) if done else b'')
+        return done
+
+    def _redo(self, ed: HexEdit) -> bool:
+        """Reapply ed and push it onto the applied stack. Returns False
+            if the data no longer matches it.
+        """
+        data = self.data
         if ed.command == 'e':
             # Replace: apply new_bytes
             if ed.start_offset >= len(data):
-                return
+                return False
             # Check if current state matches what we expect
             # Before replace, the data at start_offset should be old_bytes
             # Use len(old_bytes) instead of end_offset since data structure may have changed
             current_end = min(ed.start_offset + len(ed.old_bytes), len(data))
             current_bytes = bytes(data[ed.start_offset:current_end])
             if current_bytes != ed.old_bytes:
-                return
-            # Apply new_bytes - always reconstruct since lengths may differ
-            new_data = data[:ed.start_offset] + ed.new_bytes + data[current_end:]
-            data.clear()
-            data.extend(new_data)
+                return False
+            # Apply new_bytes; lengths may differ
+            data.replace(ed.start_offset, current_end, ed.new_bytes)
         elif ed.command == 'd':
             # Delete: remove old_bytes
             if ed.start_offset >= len(data):
-                return
+                return False
             current_end = min(ed.start_offset + len(ed.old_bytes), len(data))
             current_bytes = bytes(data[ed.start_offset:current_end])
             if current_bytes != ed.old_bytes:
-                return
-            new_data = data[:ed.start_offset] + data[current_end:]
-            data.clear()
-            data.extend(new_data)
+                return False
+            data.delete(ed.start_offset, current_end)
         elif ed.command == 'i':
             # Insert: add new_bytes
             if ed.start_offset > len(data):
-                return
-            new_data = data[:ed.start_offset] + ed.new_bytes + data[ed.start_offset:]
-            data.clear()
-            data.extend(new_data)
+                return False
+            data.insert(ed.start_offset, ed.new_bytes)
         elif ed.command == 'a':
             # Append: add new_bytes
-            data.extend(ed.new_bytes)
-        applied_edits.append(ed)
-
-    data = bytearray(read_binary_file(fpath))
-    check = hex_checksum(applied_edits, data)
-    page = 0
-    error = ''
-    offset = 0
-
-    while True:
-        if hasattr(os, 'system') and hasattr(os, 'name'):
+            data.append(ed.new_bytes)
+        self._invalidate_rows(ed)
+        self.dirty.record(ed)
+        self.history.push_redone(ed)
+        return True
+
+    def find(self, pattern: bytes, start: int = 0) -> int:
+        """Returns the offset of the first match at or after start, or -1."""
+        return self.data.find(pattern, start)
+
+    def rfind(self, pattern: bytes, stop: int = None) -> int:
+        """Returns the offset of the last match that ends at or
+            before stop, or -1.
+        """
+        return self.data.rfind(pattern, stop)
+
+    def save(self, in_place: bool = True, block_size: int = 0) -> int:
+        """Write the data to the file and mark it as saved. If in_place
+            is True and no edit since the last save changed the length
+            of the data, only the changed ranges, widened to multiples
+            of block_size, are rewritten. Returns the number of bytes
+            written.
+        """
+        data = self.data
+        # original data that is not bytes is a FileReader reading the file
+        reader = data.original if type(data.original) not in (bytes, bytearray) else None
+        if in_place and not self.dirty.resized and len(data) and file_size(self.fpath) == len(data):
+            size = write_binary_ranges(self.fpath, data, self.dirty.aligned(block_size, len(data)))
+            if reader:
+                reader.close()
+        elif reader:
+            size = write_binary_file(self.fpath, data, replace=False)
+            # an open file cannot be replaced on Windows
+            reader.close()
             try:
-                os.system('cls' if os.name == 'nt' else 'clear')
+                replace_file(f'{self.fpath}.tmp', self.fpath)
             except:
-                ...
-
-        # Calculate display range
-        total_bytes = len(data)
-
-        # Calculate which byte range we're displaying
-        # offset is now a byte offset, page advances by page_size * bytes_per_line bytes
-        start_byte = offset + (page * page_size * bytes_per_line)
-        if start_byte > total_bytes:
-            start_byte = total_bytes
-        end_byte = min(start_byte + (page_size * bytes_per_line), total_bytes)
-
-        print(f"Displaying bytes {start_byte}-{end_byte-1 if end_byte > 0 else 0}")
-
-        # Display header with column numbers
-        max_offset = len(data) - 1 if len(data) > 0 else 0
-        print(format_hex_header(bytes_per_line, max_offset))
-
-        # Display hex lines
-        hex_lines = format_hex_display(bytes(data), start_byte, bytes_per_line, page_size)
-        for line in hex_lines:
-            print(line)
-
-        print("\nCommands: [r]e[place] {offset} {count}|d[elete] {offset} {count=1}|i[nsert] {offset} {count}|a[ppend] {count}\n" + \
-            "          c[hange] {bytes_per_line=40} {page_size=35}|o[ffset] {bytes}|n[ext]|p[revious]|s[elect] {pageno}\n" + \
-            "          u[ndo] {count=1}|r[edo] {count=1}|w[rite]|q[uit]")
-        if error:
-            print(error)
-            error = ''
-
-        command = input("? ").lower().lstrip().split(' ')
-
-        try:
-            byte_offset = int(f"0{command[1]}") if len(command) > 1 else 0
-            byte_offset = 0 if byte_offset < 0 else byte_offset
-            count = int(f"0{command[2]}") if len(command) > 2 else None
-        except Exception as e:
-            error = str(e)
-            continue
-
-        if count is not None:
-            count = 1 if count < 0 else count
-
-        if command[0] in ('e', 'replace'):
-            if len(command) < 2:
-                error = 'Must specify a byte offset for replace'
-                continue
-            if byte_offset >= len(data):
-                error = f'Offset {byte_offset} is beyond end of file (length: {len(data)})'
+                # the original file is intact, so keep editing it
+                data.original = type(reader)(self.fpath)
+                raise
+        else:
+            size = write_binary_file(self.fpath, data)
+        self.dirty.clear()
+        if self.lazy:
+            self.data = open_piece_table(self.fpath, self.lazy)
+        self.history.mark_saved()
+        if self.log:
+            self.log.clear()
+            self._start_log()
+        return size
+
+    def is_dirty(self) -> bool:
+        return self.history.is_dirty()
+
+    def _header(self) -> bytes:
+        """The journal header: the size and CRC32 of the file the
+            journaled commands apply to.
+        """
+        return file_size(self.fpath).to_bytes(4, 'big') + file_crc(self.fpath).to_bytes(4, 'big')
+
+    def _start_log(self):
+        self.log.write('H', self._header())
+        self.log.flush()
+
+    def read_journal(self) -> list[tuple[str, bytes]]|None:
+        """Returns the records that an earlier session left in the
+            journal, [] if there are none, or None if the journal does
+            not match the file.
+        """
+        from editor_journal import read_journal
+        records = read_journal(self.log.path)
+        if not records:
+            return []
+        if records[0] != ('H', self._header()):
+            return None
+        return records[1:]
+
+    def start_journal(self, records: list[tuple[str, bytes]] = None):
+        """Replay the records returned by read_journal, if any, and keep
+            appending to that journal; otherwise start a new journal.
+        """
+        if not records:
+            self.log.clear()
+            self._start_log()
+            return
+        # replay without journaling; the records stay in the file
+        log, self.log = self.log, None
+        for kind, payload in records:
+            if kind == 'A':
+                self.apply(HexEdit_from_bytes(payload))
+            elif not payload:
+                # an undo or redo that changed nothing
                 continue
+            elif kind == 'U':
+                if self.history.top_record() == payload:
+                    self.undo()
+                else:
+                    # the edit predates the journal, so it is not in the
+                    # replayed history; revert it with a new edit instead
+                    self.apply(self._inverse(HexEdit_from_bytes(payload)))
+            elif kind == 'R':
+                if self.history.top_record(True) == payload:
+                    self.redo()
+                else:
+                    self.apply(HexEdit_from_bytes(payload))
+        self.log = log
+
+    def close(self, keep_journal: bool = False):
+        """Release the file and history resources. The journal is
+            deleted unless keep_journal is True.
+        """
+        self.history.close()
+        if type(self.data.original) not in (bytes, bytearray):
+            self.data.original.close()
+        if self.log and not keep_journal:
+            self.log.clear()
+
+
+def hexedit(fpath: str, page_size: int = 35, bytes_per_line: int = 40, history_buffer_size: int = 100,
+            lazy: bool = False, ansi: bool = True, show_banner: bool = True,
+            show_bytes: bool = False, row_cache_size: int = 16384, history_buffer_bytes: int = 16384,
+            history_spill_path: str = None, journal: bool = False, journal_flush_records: int = 8,
+            journal_flush_interval: int = 5, in_place: bool = True, writeback_block_size: int = 0,
+            script=None, profile: bool = False, profile_path: str = None,
+            replay_journal: bool = None, screen_rows: int = None) -> int:
+    """Edit a binary file in hex mode. This is the main function for
+        hex editing; it is an interactive front-end for a HexBuffer. If
+        lazy=True, only the bytes needed for the current page are read
+        from the file, and edits are overlaid on top of them until the
+        file is written; use this for files larger than available
+        memory. If ansi=True, only the lines that changed are
+        redrawn after each command; set it to False for terminals that
+        do not support ANSI escape codes. A frame taller than the
+        terminal (screen_rows, or the size the OS reports; MicroPython
+        cannot tell) is printed in full instead. The command banner can be
+        toggled with the b[anner] command. If show_bytes=True, the status
+        line also shows how many bytes the previous redraw sent to the
+        terminal. Formatted rows are kept in an LRU cache of up to
+        row_cache_size characters so that paging through unchanged
+        data does not reformat it; set it to 0 to disable the cache.
+        The edit history holds at most history_buffer_size edits and
+        history_buffer_bytes of edited bytes; if history_spill_path is
+        set, older edits (and an edit larger than history_buffer_bytes)
+        are moved to that file instead of dropped. If journal=True,
+        every edit, undo, and redo is appended to a journal file next
+        to the file (flushed every journal_flush_records
+        records or journal_flush_interval seconds while commands keep
+        coming from a script, and before waiting for the next typed
+        command) until the file is written; if the editor is reset
+        before then, the journal is replayed the next time the file is
+        opened. If in_place=True and no edit since the last write
+        changed the length of the data, the w[rite] command only
+        rewrites the changed byte ranges in place, widened to multiples
+        of writeback_block_size if it is set (e.g. to the flash sector
+        size); otherwise the file is rewritten in full through a
+        temporary file. If script is an iterable of
+        lines (e.g. an open file), commands and their hex input are read
+        from it instead of the terminal and nothing is drawn; the first
+        error is written to stderr and stops the script. If
+        profile=True, the time each command spent parsing, applying,
+        rendering, and writing to the terminal, the bytes it sent, and
+        the free (MicroPython) or used (CPython) heap are shown on a
+        second status line; if profile_path is also set, the last 100
+        commands are appended to it as CSV on quit. A journal left by an
+        earlier session is replayed if the user agrees, or, if
+        replay_journal is True or False, replayed or discarded without
+        asking; a script discards it unless replay_journal is True.
+        Returns 0, or 1 if a script failed or ended with unsaved edits.
+    """
+    buffer = HexBuffer(
+        fpath, lazy, history_buffer_size, history_buffer_bytes, history_spill_path,
+        journal, journal_flush_records, journal_flush_interval, row_cache_size
+    )
+    original_bytes_per_line = bytes_per_line
+    read = input
+    if script is not None:
+        script = iter(script)
 
-            # Get hex input
-            hex_input = input('')
+        def read(prompt: str = '') -> str:
             try:
-                new_bytes = parse_hex_input(hex_input)
-            except ValueError as e:
-                error = str(e)
-                continue
-
-            # Validate count if provided
-            if count is not None:
-                if len(new_bytes) != count:
-                    error = f'Expected {count} byte(s), but got {len(new_bytes)} byte(s)'
-                    continue
-            else:
-                count = len(new_bytes)
+                return next(script).rstrip('\r\n')
+            except StopIteration:
+                raise EOFError()
+
+    if buffer.log:
+        records = buffer.read_journal()
+        replay = False
+        if records and replay_journal is None and script is None:
+            print(f'Found {len(records)} unsaved journaled commands for {fpath}.')
+            replay = read('Replay them? [Y/n]: ').lower() not in ('n', 'no')
+        elif records:
+            # never take the answer from a script
+            replay = bool(replay_journal)
+            if not replay and script is not None:
+                sys.stderr.write(f'{fpath}: discarding {len(records)} unsaved journaled commands\n')
+        elif records is None and script is None:
+            print(f'Ignoring {buffer.log.path}: it does not match {fpath}.')
+            read('Press enter to continue.')
+        elif records is None:
+            sys.stderr.write(f'{fpath}: ignoring {buffer.log.path}: it does not match the file\n')
+        buffer.start_journal(records if replay else None)
 
-            if count == 0:
-                error = 'Cannot replace with zero bytes (use delete instead)'
-                continue
+    page = 0
+    error = ''
+    message = ''
+    exit_status = 0
+    offset = 0
+    pattern = b''
+    match = -1
+    highlight = None
+
+    unrecorded = buffer.history.unrecorded
+    screen = Screen(ansi, show_bytes or profile, screen_rows)
+    profiler = None
+    if profile:
+        from editor_profile import Profiler
+        profiler = Profiler(profile_path)
+        untimed = read
+
+        def read(prompt: str = '') -> str:
+            return profiler.read(untimed, prompt)
+
+    def read_line() -> str:
+        """Read a line of command input, which may scroll the terminal
+            under the frame, so the next draw redraws all of it.
+        """
+        screen.invalidate()
+        return read('')
 
-            end_offset = min(byte_offset + count, len(data))
-            old_bytes = bytes(data[byte_offset:end_offset])
+    try:
+        while True:
+            if profiler:
+                profiler.mark('apply')
+            data = buffer.data
+            if buffer.history.unrecorded != unrecorded:
+                unrecorded = buffer.history.unrecorded
+                note = 'The edit is too large for the history and cannot be undone'
+                message = f'{message}; {note}' if message else note
+            # Calculate display range
+            total_bytes = len(data)
 
-            # Perform replace - handle different lengths properly
-            # Store end_offset as the ORIGINAL end (before edit) for proper undo/redo
-            if len(new_bytes) == len(old_bytes):
-                # Same length: simple replacement
-                data[byte_offset:end_offset] = new_bytes
+            # Calculate which byte range we're displaying
+            # offset is now a byte offset, page advances by page_size * bytes_per_line bytes
+            start_byte = offset + (page * page_size * bytes_per_line)
+            if start_byte > total_bytes:
+                start_byte = total_bytes
+            end_byte = min(start_byte + (page_size * bytes_per_line), total_bytes)
+
+            if script is not None:
+                if error:
+                    sys.stderr.write(f'{fpath}: {error}\n')
+                    exit_status = 1
+                    break
+                message = ''
+                highlight = None
             else:
-                # Different length: need to reconstruct
-                new_data = data[:byte_offset] + new_bytes + data[end_offset:]
-                data.clear()
-                data.extend(new_data)
-
-            applied_edits.append(HexEdit('e', byte_offset, end_offset, old_bytes, new_bytes))
-
-        elif command[0] in ('d', 'delete'):
-            if len(command) < 2:
-                error = 'Must specify a byte offset for delete'
-                continue
-            if byte_offset >= len(data):
-                error = f'Offset {byte_offset} is beyond end of file (length: {len(data)})'
+                frame = [f"Displaying bytes {start_byte}-{end_byte-1 if end_byte > 0 else 0}"]
+
+                # Display header with column numbers
+                max_offset = len(data) - 1 if len(data) > 0 else 0
+                frame.append(format_hex_header(bytes_per_line, max_offset))
+
+                # Display hex lines
+                rows = format_hex_display(data, start_byte, bytes_per_line, page_size, buffer.row_cache)
+                if highlight and ansi:
+                    rows = [
+                        highlight_hex_line(row, start_byte + i * bytes_per_line, bytes_per_line, max_offset, *highlight)
+                        for i, row in enumerate(rows)
+                    ]
+                    highlight = None
+                frame.extend(rows)
+
+                if show_banner:
+                    frame.extend([
+                        "",
+                        "Commands: [r]e[place] {offset} {count}|d[elete] {offset} {count=1}|i[nsert] {offset} {count}|a[ppend] {count}",
+                        "          c[hange] {bytes_per_line=40} {page_size=35}|o[ffset] {bytes}|n[ext]|p[revious]|s[elect] {pageno}",
+                        "          u[ndo] {count=1}|r[edo] {count=1}|w[rite]|q[uit]|b[anner]",
+                        "          /{hex|\"text\"} (search forward)|?{hex|\"text\"} (search backward)",
+                    ])
+                status = buffer.history.status()
+                if show_bytes:
+                    status = f'{status}; last redraw: {screen.last_bytes} bytes; total: {screen.total_bytes} bytes'
+                frame.append(status)
+                if profiler:
+                    frame.append(profiler.status())
+                if error:
+                    frame.append(error)
+                    error = ''
+                if message:
+                    frame.append(message)
+                    message = ''
+                if profiler:
+                    profiler.mark('render')
+                screen.draw(frame)
+                if profiler:
+                    profiler.mark('write')
+
+            if profiler:
+                profiler.finish(screen.last_bytes if script is None else 0)
+            if buffer.log:
+                if script is None:
+                    # the user may be idle for any length of time, so
+                    # nothing this command journaled stays in memory
+                    buffer.log.flush()
+                else:
+                    buffer.log.tick()
+            try:
+                command = read("? ").lstrip()
+            except EOFError:
+                if script is None:
+                    raise
+                if buffer.is_dirty():
+                    sys.stderr.write(f'{fpath}: script ended with unsaved edits\n')
+                    exit_status = 1
+                break
+            if profiler:
+                profiler.mark()
+                profiler.command = command
+            if script is not None and command[:1] == '#':
                 continue
 
-            if count is None:
-                count = 1
-            if count <= 0:
-                error = 'Count must be positive'
+            if command[:1] in ('/', '?'):
+                # Search; an empty term repeats the last search from the last match
+                term = command[1:]
+                if term.strip():
+                    try:
+                        pattern = parse_search_input(term)
+                    except ValueError as e:
+                        error = str(e)
+                        continue
+                    match = -1
+                if not pattern:
+                    error = 'Must specify a hex or "text" search term'
+                    continue
+                if command[0] == '/':
+                    found = buffer.find(pattern, match + 1 if match >= 0 else start_byte)
+                else:
+                    found = buffer.rfind(pattern, (match if match >= 0 else start_byte) + len(pattern) - 1)
+                if found < 0:
+                    error = 'Pattern not found'
+                    continue
+                match = found
+                highlight = (found, found + len(pattern))
+                offset = found - found % bytes_per_line
+                page = 0
+                message = f'Match at offset {found}'
                 continue
 
-            end_offset = min(byte_offset + count, len(data))
-            old_bytes = bytes(data[byte_offset:end_offset])
-
-            # Perform delete
-            new_data = data[:byte_offset] + data[end_offset:]
-            data.clear()
-            data.extend(new_data)
-
-            applied_edits.append(HexEdit('d', byte_offset, end_offset, old_bytes, b''))
-
-        elif command[0] in ('i', 'insert'):
-            if len(command) < 2:
-                error = 'Must specify a byte offset for insert'
-                continue
-            if byte_offset > len(data):
-                error = f'Offset {byte_offset} is beyond end of file (length: {len(data)})'
-                continue
+            command = command.lower().split(' ')
 
-            # Get hex input
-            hex_input = input('')
             try:
-                new_bytes = parse_hex_input(hex_input)
-            except ValueError as e:
+                byte_offset = int(f"0{command[1]}") if len(command) > 1 else 0
+                byte_offset = 0 if byte_offset < 0 else byte_offset
+                count = int(f"0{command[2]}") if len(command) > 2 else None
+            except Exception as e:
                 error = str(e)
                 continue
 
-            # Validate count if provided
             if count is not None:
-                if len(new_bytes) != count:
-                    error = f'Expected {count} byte(s), but got {len(new_bytes)} byte(s)'
-                    continue
-            else:
-                count = len(new_bytes)
+                count = 1 if count < 0 else count
+            if profiler:
+                profiler.mark('parse')
 
-            if count == 0:
-                error = 'Cannot insert zero bytes'
-                continue
+            if command[0] in ('e', 'replace'):
+                if len(command) < 2:
+                    error = 'Must specify a byte offset for replace'
+                    continue
+                if byte_offset >= len(data):
+                    error = f'Offset {byte_offset} is beyond end of file (length: {len(data)})'
+                    continue
 
-            # Perform insert
-            new_data = data[:byte_offset] + new_bytes + data[byte_offset:]
-            data.clear()
-            data.extend(new_data)
+                # Get hex input
+                hex_input = read_line()
+                try:
+                    new_bytes = parse_hex_input(hex_input)
+                except ValueError as e:
+                    error = str(e)
+                    continue
 
-            applied_edits.append(HexEdit('i', byte_offset, byte_offset, b'', new_bytes))
+                # Validate count if provided
+                if count is not None:
+                    if len(new_bytes) != count:
+                        error = f'Expected {count} byte(s), but got {len(new_bytes)} byte(s)'
+                        continue
+                else:
+                    count = len(new_bytes)
 
-        elif command[0] in ('a', 'append'):
-            # Get hex input
-            hex_input = input('')
-            try:
-                new_bytes = parse_hex_input(hex_input)
-            except ValueError as e:
-                error = str(e)
-                continue
+                try:
+                    buffer.replace(byte_offset, new_bytes)
+                except ValueError as e:
+                    error = str(e)
 
-            # Validate count if provided
-            count = byte_offset
-            if count is not None:
-                if len(new_bytes) != count:
-                    error = f'Expected {count} byte(s), but got {len(new_bytes)} byte(s)'
+            elif command[0] in ('d', 'delete'):
+                if len(command) < 2:
+                    error = 'Must specify a byte offset for delete'
+                    continue
+                try:
+                    buffer.delete(byte_offset, 1 if count is None else count)
+                except ValueError as e:
+                    error = str(e)
+
+            elif command[0] in ('i', 'insert'):
+                if len(command) < 2:
+                    error = 'Must specify a byte offset for insert'
+                    continue
+                if byte_offset > len(data):
+                    error = f'Offset {byte_offset} is beyond end of file (length: {len(data)})'
                     continue
-            else:
-                count = len(new_bytes)
 
-            if count == 0:
-                error = 'Cannot append zero bytes'
-                continue
+                # Get hex input
+                hex_input = read_line()
+                try:
+                    new_bytes = parse_hex_input(hex_input)
+                except ValueError as e:
+                    error = str(e)
+                    continue
 
-            # Perform append
-            start_pos = len(data)
-            data.extend(new_bytes)
-
-            applied_edits.append(HexEdit('a', start_pos, start_pos, b'', new_bytes))
-
-        elif command[0] in ('u', 'undo'):
-            undo()
-            undo_count = count if count is not None else 1
-            while undo_count > 1:
-                undo_count -= 1
-                undo()
-
-        elif command[0] in ('r', 'redo'):
-            redo()
-            redo_count = count if count is not None else 1
-            while redo_count > 1:
-                redo_count -= 1
-                redo()
-
-        elif command[0] in ('c', 'change'):
-            if len(command) < 2:
-                byte_offset = original_bytes_per_line
-            bytes_per_line = byte_offset
-            if bytes_per_line <= 0:
-                bytes_per_line = original_bytes_per_line
-                error = f'Bytes per line must be positive; set to {original_bytes_per_line}.'
-            if count:
-                if count > 0:
-                    page_size = count
+                # Validate count if provided
+                if count is not None:
+                    if len(new_bytes) != count:
+                        error = f'Expected {count} byte(s), but got {len(new_bytes)} byte(s)'
+                        continue
                 else:
-                    error = f'{error} Page size must be positive.'
-
-        elif command[0] in ('o', 'offset'):
-            if len(command) < 2:
-                error = 'Must specify a byte offset'
-                continue
-            offset = byte_offset
-            page = 0
+                    count = len(new_bytes)
+
+                try:
+                    buffer.insert(byte_offset, new_bytes)
+                except ValueError as e:
+                    error = str(e)
+
+            elif command[0] in ('a', 'append'):
+                # Get hex input
+                hex_input = read_line()
+                try:
+                    new_bytes = parse_hex_input(hex_input)
+                except ValueError as e:
+                    error = str(e)
+                    continue
 
-        elif command[0] in ('n', 'next'):
-            total_bytes = len(data)
-            next_start = offset + ((page + 1) * page_size * bytes_per_line)
-            if next_start >= total_bytes:
+                # Validate count if provided
+                count = byte_offset
+                if count is not None:
+                    if len(new_bytes) != count:
+                        error = f'Expected {count} byte(s), but got {len(new_bytes)} byte(s)'
+                        continue
+                else:
+                    count = len(new_bytes)
+
+                try:
+                    buffer.append(new_bytes)
+                except ValueError as e:
+                    error = str(e)
+
+            elif command[0] in ('u', 'undo'):
+                buffer.undo()
+                undo_count = count if count is not None else 1
+                while undo_count > 1:
+                    undo_count -= 1
+                    buffer.undo()
+
+            elif command[0] in ('r', 'redo'):
+                buffer.redo()
+                redo_count = count if count is not None else 1
+                while redo_count > 1:
+                    redo_count -= 1
+                    buffer.redo()
+
+            elif command[0] in ('c', 'change'):
+                if len(command) < 2:
+                    byte_offset = original_bytes_per_line
+                bytes_per_line = byte_offset
+                if bytes_per_line <= 0:
+                    bytes_per_line = original_bytes_per_line
+                    error = f'Bytes per line must be positive; set to {original_bytes_per_line}.'
+                if count:
+                    if count > 0:
+                        page_size = count
+                    else:
+                        error = f'{error} Page size must be positive.'
+
+            elif command[0] in ('o', 'offset'):
+                if len(command) < 2:
+                    error = 'Must specify a byte offset'
+                    continue
+                offset = byte_offset
                 page = 0
-            else:
-                page = page + 1
 
-        elif command[0] in ('p', 'previous'):
-            if page == 0:
-                # Calculate max page based on offset
+            elif command[0] in ('n', 'next'):
                 total_bytes = len(data)
-                max_bytes_from_offset = max(0, total_bytes - offset)
-                max_page = (max_bytes_from_offset + page_size * bytes_per_line - 1) // (page_size * bytes_per_line) - 1
-                if max_page < 0:
-                    max_page = 0
-                page = max_page
-            else:
-                page = page - 1
+                next_start = offset + ((page + 1) * page_size * bytes_per_line)
+                if next_start >= total_bytes:
+                    page = 0
+                else:
+                    page = page + 1
+
+            elif command[0] in ('p', 'previous'):
+                if page == 0:
+                    # Calculate max page based on offset
+                    total_bytes = len(data)
+                    max_bytes_from_offset = max(0, total_bytes - offset)
+                    max_page = (max_bytes_from_offset + page_size * bytes_per_line - 1) // (page_size * bytes_per_line) - 1
+                    if max_page < 0:
+                        max_page = 0
+                    page = max_page
+                else:
+                    page = page - 1
 
-        elif command[0] in ('s', 'select'):
-            if len(command) < 2:
-                error = 'Must specify a page index to select a page'
-                continue
-            total_bytes = len(data)
-            selected_start = offset + (byte_offset * page_size * bytes_per_line)
-            if selected_start < total_bytes:
-                page = byte_offset
-
-        elif command[0] in ('w', 'write'):
-            write_binary_file(fpath, bytes(data))
-            check = hex_checksum(applied_edits, data)
-
-        elif command[0] in ('q', 'quit'):
-            if check != hex_checksum(applied_edits, data):
-                print('Unsaved edits detected. Are you sure you want to quit?')
-                confirm = input('[y/N]: ')
-                if confirm.lower() in ('y', 'yes'):
+            elif command[0] in ('s', 'select'):
+                if len(command) < 2:
+                    error = 'Must specify a page index to select a page'
+                    continue
+                total_bytes = len(data)
+                selected_start = offset + (byte_offset * page_size * bytes_per_line)
+                if selected_start < total_bytes:
+                    page = byte_offset
+
+            elif command[0] in ('b', 'banner'):
+                show_banner = not show_banner
+
+            elif command[0] in ('w', 'write'):
+                began = ticks_ms()
+                size = buffer.save(in_place, writeback_block_size)
+                elapsed = ticks_diff(ticks_ms(), began)
+                message = (f'Wrote {size} bytes in {elapsed} ms ({size * 1000 // max(elapsed, 1)} '
+                    f'bytes/s, {WRITE_CHUNK_SIZE} byte buffer)')
+
+            elif command[0] in ('q', 'quit'):
+                if buffer.is_dirty() and script is None:
+                    print('Unsaved edits detected. Are you sure you want to quit?')
+                    confirm = input('[y/N]: ')
+                    if confirm.lower() in ('y', 'yes'):
+                        break
+                    screen.invalidate()
+                else:
                     break
-            else:
-                break
+
+            elif command[0]:
+                error = f'Unknown command: {command[0]}'
+
+    except EOFError:
+        if script is None:
+            buffer.close(keep_journal=True)
+            raise
+        sys.stderr.write(f'{fpath}: unexpected end of script\n')
+        exit_status = 1
+    except:
+        buffer.close(keep_journal=True)
+        raise
+    finally:
+        if profiler:
+            profiler.close()
+    buffer.close()
+    return exit_status
+
+def batch_hexedit(fpath: str, script_path: str = '-', **kwargs) -> int:
+    """Apply the commands in a script file, or stdin if script_path is
+        '-', to a file without drawing anything. The script uses the
+        same commands as hexedit, each followed by its hex input, e.g.
+        "e 16" and then "DE AD BE EF". Lines starting with # are
+        ignored where a command is expected. Other keyword arguments
+        are passed to hexedit. Returns 0 on success and 1 on failure.
+    """
+    if script_path == '-':
+        return hexedit(fpath, script=sys.stdin, **kwargs)
+    with open(script_path, 'r') as f:
+        return hexedit(fpath, script=f, **kwargs)
 
 
 if __name__ == '__main__':
-    if len(argv) > 1:
+    lazy = '--lazy' in argv
+    replay_journal = '--replay-journal' in argv
+    journal = replay_journal or '--journal' in argv
+    profile = '--profile' in argv
+    script_path = None
+    if '--script' in argv:
+        i = argv.index('--script')
+        script_path = argv[i+1] if len(argv) > i + 1 else '-'
+        argv = argv[:i] + argv[i+2:]
+    argv = [a for a in argv if a not in ('--lazy', '--journal', '--replay-journal', '--profile')]
+    if len(argv) > 1 and script_path:
+        sys.exit(batch_hexedit(argv[1], script_path, lazy=lazy, journal=journal, profile=profile,
+                               replay_journal=replay_journal))
+    elif len(argv) > 1:
         filename = argv[1]
         page_size = int(f"0{argv[2]}") if len(argv) > 2 else 0
         bytes_per_line = int(f"0{argv[3]}") if len(argv) > 3 else 0
         if page_size:
             if bytes_per_line:
-                hexedit(filename, page_size, bytes_per_line)
+                hexedit(filename, page_size, bytes_per_line, lazy=lazy, journal=journal, profile=profile)
             else:
-                hexedit(filename, page_size)
+                hexedit(filename, page_size, lazy=lazy, journal=journal, profile=profile)
         else:
-            hexedit(filename)
+            hexedit(filename, lazy=lazy, journal=journal, profile=profile)
     else:
-        print(f'Usage: {argv[0]} /path/to/file [page_size] [bytes_per_line]')
+        print(f'Usage: {argv[0]} /path/to/file [page_size] [bytes_per_line] [--lazy] [--journal] [--profile] [--script {{path|-}}]')
         print('       The page_size parameter is optional; default is 35')
         print('       The bytes_per_line parameter is optional; default is 40')
+        print('       The --lazy flag reads only the displayed bytes from the file')
+        print('       The --journal flag journals unsaved edits for recovery after a reset')
+        print('       The --profile flag shows per-command timings, bytes sent, and heap use')
+        print('       The --script flag applies the commands in a file (or stdin) without drawing')
+        print('       The --replay-journal flag replays a leftover journal first instead of')
+        print('       asking or, with --script, discarding it')
 
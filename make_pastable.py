@@ -1,4 +1,10 @@
+from binascii import b2a_base64, crc32
 from sys import argv
+import ast
+import builtins
+import keyword
+import sys
+import zlib
 
 
 def make_editor_pastable() -> str:
@@ -17,18 +23,318 @@ def make_hexeditor_pastable() -> str:
         data = f.read()
     return data.replace('\\', '\\\\')
 
+def is_docstring(node: ast.AST) -> bool:
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) \
+        and isinstance(node.value.value, str)
+
+def strip_docstrings_and_hints(tree: ast.Module):
+    """Remove docstrings, bare string statements (such as the license
+        text), and type hints from a module in place.
+    """
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            node.returns = None
+            args = node.args
+            for arg in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg]:
+                if arg is not None:
+                    arg.annotation = None
+        if not hasattr(node, 'body') or not isinstance(node.body, list):
+            continue
+        body = []
+        for child in node.body:
+            if is_docstring(child):
+                continue
+            if isinstance(child, ast.AnnAssign):
+                if child.value is None:
+                    continue
+                child = ast.Assign([child.target], child.value, lineno=child.lineno)
+            body.append(child)
+        node.body = body or [ast.Pass()]
+
+def short_names(taken: set[str]):
+    """Yield the shortest identifiers that are not in taken."""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    names = list(letters)
+    while True:
+        for name in names:
+            if name not in taken and not keyword.iskeyword(name):
+                yield name
+        names = [n + c for n in names for c in letters]
+
+def bound_names(node: ast.AST) -> set[str]:
+    """Returns the names a function or lambda binds in its own scope,
+        including its parameters.
+    """
+    args = node.args
+    names = {a.arg for a in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg] if a}
+    body = node.body if isinstance(node.body, list) else [node.body]
+    for child in body:
+        for sub in walk_scope(child):
+            if isinstance(sub, ast.Name) and isinstance(sub.ctx, (ast.Store, ast.Del)):
+                names.add(sub.id)
+            elif isinstance(sub, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                names.add(sub.name)
+            elif isinstance(sub, ast.ExceptHandler) and sub.name:
+                names.add(sub.name)
+    return names
+
+def walk_scope(node: ast.AST):
+    """Like ast.walk, but does not descend into nested functions,
+        lambdas, or classes (the nested node itself is yielded).
+    """
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)):
+            # decorators and defaults are evaluated in the enclosing scope
+            todo.extend(getattr(node, 'decorator_list', []))
+            if hasattr(node, 'args'):
+                todo.extend(node.args.defaults + [d for d in node.args.kw_defaults if d])
+            continue
+        todo.extend(ast.iter_child_nodes(node))
+
+def shorten_locals(tree: ast.Module):
+    """Rename the local variables of every function to the shortest
+        unused names. Parameters are kept, since callers may pass them
+        by keyword, as are names declared global or nonlocal, names
+        bound by imports, and the locals of any function that contains
+        a class or uses locals(), vars(), eval(), or exec(). A local
+        that a nested function or lambda also binds is kept, and one
+        that is only bound by a comprehension is kept if it is also a
+        module-level or builtin name.
+    """
+    module_names = {n.id for n in ast.walk(tree) if isinstance(n, ast.Name)} | \
+        {n.name for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.ClassDef))} | \
+        {n.arg for n in ast.walk(tree) if isinstance(n, ast.arg)} | set(dir(builtins))
+    top_level = set()
+    for stmt in tree.body:
+        for sub in walk_scope(stmt):
+            if isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Store):
+                top_level.add(sub.id)
+            elif isinstance(sub, (ast.FunctionDef, ast.ClassDef)):
+                top_level.add(sub.name)
+            elif isinstance(sub, (ast.Import, ast.ImportFrom)):
+                top_level.update([(a.asname or a.name).split('.')[0] for a in sub.names])
+
+    for func in [n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]:
+        subtree = list(ast.walk(func))
+        if any(isinstance(n, ast.ClassDef) for n in subtree[1:]) or any(
+            isinstance(n, ast.Call) and isinstance(n.func, ast.Name)
+            and n.func.id in ('locals', 'vars', 'eval', 'exec') for n in subtree
+        ):
+            continue
+        args = func.args
+        keep = {a.arg for a in args.posonlyargs + args.args + args.kwonlyargs + [args.vararg, args.kwarg] if a}
+        comprehension_only = set()
+        local = set()
+        for child in func.body:
+            for sub in walk_scope(child):
+                if isinstance(sub, (ast.Global, ast.Nonlocal)):
+                    keep.update(sub.names)
+                elif isinstance(sub, (ast.Import, ast.ImportFrom)):
+                    keep.update([(a.asname or a.name).split('.')[0] for a in sub.names])
+                elif isinstance(sub, ast.Name) and isinstance(sub.ctx, (ast.Store, ast.Del)):
+                    local.add(sub.id)
+                elif isinstance(sub, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    local.add(sub.name)
+                    keep.update(bound_names(sub))
+                elif isinstance(sub, ast.Lambda):
+                    keep.update(bound_names(sub))
+                elif isinstance(sub, ast.ExceptHandler) and sub.name:
+                    local.add(sub.name)
+                elif isinstance(sub, ast.comprehension):
+                    comprehension_only.update([n.id for n in ast.walk(sub.target) if isinstance(n, ast.Name)])
+        # a comprehension variable is local to the comprehension, so a
+        # global of the same name may be used elsewhere in the function
+        keep.update((comprehension_only - local) & (top_level | set(dir(builtins))))
+        local = (local | comprehension_only) - keep
+        if not local:
+            continue
+        taken = module_names | {n.id for n in subtree if isinstance(n, ast.Name)} | \
+            {n.arg for n in subtree if isinstance(n, ast.arg)}
+        fresh = short_names(taken)
+        mapping = {}
+        for name in sorted(local, key=lambda n: (-len(n), n)):
+            new = next(fresh)
+            if len(new) < len(name):
+                mapping[name] = new
+        for node in subtree:
+            if isinstance(node, ast.Name) and node.id in mapping:
+                node.id = mapping[node.id]
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node is not func \
+                    and node.name in mapping:
+                node.name = mapping[node.name]
+            elif isinstance(node, ast.ExceptHandler) and node.name in mapping:
+                node.name = mapping[node.name]
+            elif isinstance(node, ast.Nonlocal):
+                node.names = [mapping.get(n, n) for n in node.names]
+
+def reindent(source: str) -> str:
+    """Replace the four-space indents of ast.unparse output with one
+        space per level and drop the blank lines. ast.unparse writes
+        every string other than a docstring on one line, so every
+        leading space is indentation and no string spans a blank line.
+    """
+    lines = []
+    for line in source.split('\n'):
+        stripped = line.lstrip(' ')
+        if stripped:
+            lines.append(' ' * ((len(line) - len(stripped)) // 4) + stripped)
+    return '\n'.join(lines)
+
+def code_objects(code):
+    yield code
+    for const in code.co_consts:
+        if hasattr(const, 'co_code'):
+            yield from code_objects(const)
+
+def verify(source: str, minified: str, tree: ast.Module):
+    """Check that the minified source is the transformed tree and that
+        it compiles to the same code objects with the same parameters,
+        referencing no global or attribute name that the original did
+        not. Raises ValueError otherwise.
+    """
+    if ast.dump(ast.parse(minified)) != ast.dump(tree):
+        raise ValueError('minified source does not parse back to the transformed tree')
+    original = list(code_objects(compile(source, 'original', 'exec')))
+    result = list(code_objects(compile(minified, 'minified', 'exec')))
+    if len(original) != len(result):
+        raise ValueError(f'{len(original)} code objects became {len(result)}')
+    for a, b in zip(original, result):
+        argcount = a.co_argcount + a.co_kwonlyargcount
+        if a.co_name != b.co_name and a.co_name != '<module>':
+            # nested functions may be renamed like other locals
+            if not (set(b.co_name) <= set('abcdefghijklmnopqrstuvwxyz') and len(b.co_name) < len(a.co_name)):
+                raise ValueError(f'{a.co_name} was renamed to {b.co_name}')
+        if a.co_varnames[:argcount] != b.co_varnames[:argcount]:
+            raise ValueError(f'the parameters of {a.co_name} changed')
+        extra = set(b.co_names) - set(a.co_names)
+        if extra:
+            raise ValueError(f'{a.co_name} references new names: {", ".join(sorted(extra))}')
+
+def minify(source: str) -> str:
+    """Strip the comments, docstrings, license text, and type hints from
+        a module, shorten the local variable names, and indent with one
+        space. The result is verified against the original.
+    """
+    tree = ast.parse(source)
+    strip_docstrings_and_hints(tree)
+    shorten_locals(tree)
+    ast.fix_missing_locations(tree)
+    minified = reindent(ast.unparse(tree)) + '\n'
+    verify(source, minified, tree)
+    return minified
+
+def paste_seconds(size: int, baud: int) -> float:
+    """Estimated time to send size bytes at baud, with 10 bits (8N1)
+        per byte.
+    """
+    return size * 10 / baud
+
+LOADER = """import binascii,io
+p=binascii.a2b_base64('''
+{payload}'''.replace('\\n',''))
+try:
+ import deflate
+ d=deflate.DeflateIO(io.BytesIO(p),deflate.ZLIB)
+except ImportError:
+ import zlib
+ if hasattr(zlib,'DecompIO'):
+  d=zlib.DecompIO(io.BytesIO(p),{wbits})
+ else:
+  d=io.BytesIO(zlib.decompress(p))
+c=0
+with open({target!r},'wb') as f:
+ while 1:
+  b=d.read(512)
+  if not b:
+   break
+  c=binascii.crc32(b,c)
+  f.write(b)
+del p,d
+if c!={crc}:
+ import os
+ os.remove({target!r})
+ raise ValueError('CRC32 mismatch; {target} not written')
+print('wrote',{target!r})
+"""
+
+def make_loader(data: str, target: str, wbits: int = 10) -> str:
+    """Compress data with zlib (a 2**wbits byte window, so that little
+        memory is needed to decompress it), encode it in base64, and
+        return a script that writes it to target on the device. The
+        script decompresses the data with MicroPython's deflate module,
+        or zlib on older firmware and CPython, in 512-byte chunks, and
+        deletes target if the CRC32 of the result does not match.
+    """
+    data = data.encode()
+    compressor = zlib.compressobj(9, zlib.DEFLATED, wbits)
+    compressed = compressor.compress(data) + compressor.flush()
+    payload = b2a_base64(compressed, newline=False).decode()
+    payload = '\n'.join([payload[i:i+76] for i in range(0, len(payload), 76)])
+    return LOADER.format(payload=payload, wbits=wbits, target=target, crc=crc32(data))
+
+def make_pastable(fpath: str, minified: bool = False, baud: int = 115200,
+                  compressed: bool = False, target: str = None) -> str:
+    """Reads a source file and optionally minifies it. If compressed is
+        True, returns a loader script (see make_loader) that writes it
+        to target, or to its file name if target is not set; otherwise,
+        doubles its backslashes. The payload size and estimated paste
+        time are written to stderr.
+    """
+    with open(fpath, 'r') as f:
+        data = f.read()
+    original = len(data.encode())
+    if minified:
+        data = minify(data)
+    if compressed:
+        data = make_loader(data, target or fpath.split('/')[-1])
+    else:
+        data = data.replace('\\', '\\\\')
+        if "'''" in data:
+            raise ValueError(f"{fpath} contains ''' and cannot be pasted as a ''' string")
+    size = len(data.encode())
+    sys.stderr.write(
+        f'{fpath}: {size} bytes ({size * 100 // original}% of {original}); '
+        f'~{paste_seconds(size, baud):.1f} s to paste at {baud} baud\n'
+    )
+    return data
+
+# the modules that can be installed on a device
+MODULES = (
+    'editor', 'hexeditor', 'editor_utils', 'editor_lazy', 'editor_reader',
+    'editor_journal', 'editor_profile', 'editor_search', 'editor_spill',
+)
+
 def usage():
     """Tool usage help text."""
-    print('Usage: python make_pastable.py [editor|hexeditor]')
+    print(f"Usage: python make_pastable.py [{'|'.join(MODULES)}] [--minify] [--compress [--target path]] [--baud 115200]")
+    print('       The --minify flag strips comments, docstrings, and type hints and')
+    print('       shortens local names; the payload size and estimated paste time at')
+    print('       the --baud rate are written to stderr')
+    print('       The --compress flag prints a script to run in paste mode (Ctrl-E) that')
+    print('       decompresses the file and writes it to the --target path')
 
 
 if __name__ == '__main__':
+    minified = '--minify' in argv
+    compressed = '--compress' in argv
+    baud = 115200
+    target = None
+    if '--baud' in argv:
+        i = argv.index('--baud')
+        baud = int(argv[i+1]) if len(argv) > i + 1 else baud
+        argv = argv[:i] + argv[i+2:]
+    if '--target' in argv:
+        i = argv.index('--target')
+        target = argv[i+1] if len(argv) > i + 1 else None
+        argv = argv[:i] + argv[i+2:]
+    argv = [a for a in argv if a not in ('--minify', '--compress')]
     if len(argv) < 2:
         usage()
         exit()
-    if argv[1] == 'editor':
-        print(make_editor_pastable())
-    elif argv[1] == 'hexeditor':
-        print(make_hexeditor_pastable())
+    if argv[1] in MODULES:
+        print(make_pastable(f'{argv[1]}.py', minified, baud, compressed, target))
     else:
         usage()
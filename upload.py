@@ -0,0 +1,374 @@
+from binascii import crc32
+from contextlib import redirect_stdout
+from sys import argv
+from time import sleep, time
+import builtins
+import io
+import os
+import select
+import sys
+import tempfile
+import termios
+import threading
+import traceback
+import tty
+
+import make_pastable
+
+
+CRC_SCRIPT = """import binascii
+c=0
+with open({target!r},'rb') as f:
+ while 1:
+  b=f.read(512)
+  if not b:
+   break
+  c=binascii.crc32(b,c)
+print(c)
+del c,b,f
+"""
+
+
+class RawRepl:
+    """MicroPython raw REPL over a serial port or pty. Code is sent in
+        raw-paste mode where the device supports it: the device grants
+        a window of bytes and sends 0x01 each time it has room for
+        another window, so the host never sends more than the device
+        can buffer. On older firmware, it falls back to the plain raw
+        REPL, sending 256-byte chunks with a short pause between them.
+        Every exec waits for the device to acknowledge the code and
+        return its output before the next one is sent.
+    """
+    __slots__ = ('fd', 'timeout', 'raw_paste')
+
+    def __init__(self, path: str, baud: int = 115200, timeout: float = 10.0):
+        self.fd = os.open(path, os.O_RDWR | os.O_NOCTTY)
+        tty.setraw(self.fd)
+        attrs = termios.tcgetattr(self.fd)
+        attrs[4] = attrs[5] = getattr(termios, f'B{baud}')
+        termios.tcsetattr(self.fd, termios.TCSANOW, attrs)
+        self.timeout = timeout
+        # None until the first exec finds out whether it is supported
+        self.raw_paste = None
+
+    def pending(self) -> bool:
+        return bool(select.select([self.fd], [], [], 0)[0])
+
+    def read(self, size: int = 1) -> bytes:
+        """Read exactly size bytes or raise TimeoutError."""
+        data = b''
+        deadline = time() + self.timeout
+        while len(data) < size:
+            if not select.select([self.fd], [], [], max(deadline - time(), 0))[0]:
+                raise TimeoutError(f'device did not respond; got {data!r}')
+            data += os.read(self.fd, size - len(data))
+        return data
+
+    def read_until(self, ending: bytes) -> bytes:
+        data = b''
+        while not data.endswith(ending):
+            data += self.read(1)
+        return data
+
+    def write(self, data: bytes):
+        while data:
+            data = data[os.write(self.fd, data):]
+
+    def drain(self):
+        """Discard anything the device has already sent."""
+        while self.pending():
+            os.read(self.fd, 256)
+
+    def enter(self):
+        """Interrupt any running program and enter the raw REPL."""
+        self.write(b'\r\x03\x03')
+        sleep(0.1)
+        self.drain()
+        self.write(b'\r\x01')
+        self.read_until(b'raw REPL; CTRL-B to exit\r\n>')
+
+    def exit(self):
+        self.write(b'\r\x02')
+
+    def close(self):
+        os.close(self.fd)
+
+    def _paste(self, data: bytes):
+        """Send data in raw-paste mode, honouring the device's window."""
+        window = int.from_bytes(self.read(2), 'little')
+        remaining = window
+        i = 0
+        while i < len(data):
+            while remaining == 0 or self.pending():
+                b = self.read(1)
+                if b == b'\x01':
+                    remaining += window
+                elif b == b'\x04':
+                    # the device wants the host to stop sending
+                    self.write(b'\x04')
+                    return
+                else:
+                    raise RuntimeError(f'unexpected {b!r} during raw paste')
+            chunk = data[i:i+remaining]
+            self.write(chunk)
+            i += len(chunk)
+            remaining -= len(chunk)
+        self.write(b'\x04')
+        self.read_until(b'\x04')
+
+    def _raw(self, data: bytes, chunk_size: int = 256):
+        for i in range(0, len(data), chunk_size):
+            self.write(data[i:i+chunk_size])
+            sleep(0.01)
+        self.write(b'\x04')
+        if self.read(2) != b'OK':
+            raise RuntimeError('device did not accept the code')
+
+    def exec(self, code: str) -> str:
+        """Run code on the device and return what it printed. Raises
+            RuntimeError with the device's traceback if it failed.
+        """
+        data = code.encode()
+        if self.raw_paste is not False:
+            self.write(b'\x05A\x01')
+            response = self.read(2)
+            if response == b'R\x01':
+                self.raw_paste = True
+                self._paste(data)
+            elif response == b'R\x00':
+                self.raw_paste = False
+                self._raw(data)
+            else:
+                # firmware without raw-paste mode prints the banner again
+                self.raw_paste = False
+                self.read_until(b'w REPL; CTRL-B to exit\r\n>')
+                self._raw(data)
+        else:
+            self._raw(data)
+        out = self.read_until(b'\x04')[:-1]
+        err = self.read_until(b'\x04')[:-1]
+        self.read_until(b'>')
+        if err:
+            raise RuntimeError(err.decode(errors='replace'))
+        return out.decode(errors='replace')
+
+
+def upload(port: str, fpath: str, target: str = None, baud: int = 115200, minified: bool = False,
+           compressed: bool = False, chunk_size: int = 1024) -> int:
+    """Install the file at fpath on the device at port as target (by
+        default, its file name), optionally minified and/or sent as a
+        compressed loader (see make_pastable). Uncompressed files are
+        written in chunk_size byte writes, each acknowledged by the
+        device before the next is sent. The CRC32 of the written file
+        is checked on the device. Returns the number of bytes written;
+        raises ValueError if the CRC32 does not match.
+    """
+    target = target or fpath.split('/')[-1]
+    with open(fpath, 'r') as f:
+        data = f.read()
+    if minified:
+        data = make_pastable.minify(data)
+    payload = data.encode()
+    repl = RawRepl(port, baud)
+    try:
+        repl.enter()
+        if compressed:
+            repl.exec(make_pastable.make_loader(data, target))
+        else:
+            repl.exec(f'f=open({target!r},"wb")')
+            for i in range(0, len(payload), chunk_size):
+                repl.exec(f'f.write({payload[i:i+chunk_size]!r})')
+            repl.exec('f.close()\ndel f')
+        crc = int(repl.exec(CRC_SCRIPT.format(target=target)).strip())
+        if crc != crc32(payload):
+            raise ValueError(f'CRC32 mismatch: wrote {crc:08x}, expected {crc32(payload):08x}')
+    finally:
+        repl.exit()
+        repl.close()
+    return len(payload)
+
+
+class EmulatedFS:
+    """The filesystem seen by the code the Emulator runs: open and the
+        parts of the os module that device scripts use, with every path
+        mapped into root. Device paths are resolved from / as on the
+        device, so neither absolute paths nor .. can leave root.
+    """
+    __slots__ = ('root',)
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, path: str) -> str:
+        return os.path.join(self.root, os.path.normpath(os.path.join('/', path)).lstrip('/'))
+
+    def open(self, path: str, mode: str = 'r', *args, **kwargs):
+        path = self.path(path)
+        if any([c in mode for c in 'wax']):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        return open(path, mode, *args, **kwargs)
+
+    def remove(self, path: str):
+        os.remove(self.path(path))
+
+    def rename(self, src: str, dst: str):
+        os.rename(self.path(src), self.path(dst))
+
+    def stat(self, path: str):
+        return os.stat(self.path(path))
+
+    def listdir(self, path: str = '/') -> list[str]:
+        return os.listdir(self.path(path))
+
+    def mkdir(self, path: str):
+        os.mkdir(self.path(path))
+
+    def import_(self, name: str, *args, **kwargs):
+        """__import__ for the emulated code: os is this filesystem."""
+        if name in ('os', 'uos'):
+            return self
+        return __import__(name, *args, **kwargs)
+
+
+class Emulator:
+    """Stand-in for a MicroPython device on a local pty, for trying the
+        uploader without hardware. It implements the raw REPL and the
+        raw-paste handshake and flow control, and runs the received code
+        with exec on an EmulatedFS in a temporary directory, which
+        close() deletes, so nothing is written to the host's files.
+        Bytes sent beyond the granted window are dropped, as an overrun
+        UART would, and counted in overruns. Set raw_paste=False to
+        emulate firmware that answers R\\x00.
+    """
+
+    def __init__(self, window: int = 128, raw_paste: bool = True):
+        self.window = window
+        self.raw_paste = raw_paste
+        self.overruns = 0
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.path = os.ttyname(self.slave)
+        self.root = tempfile.TemporaryDirectory()
+        self.fs = EmulatedFS(self.root.name)
+        scope_builtins = dict(vars(builtins))
+        scope_builtins['open'] = self.fs.open
+        scope_builtins['__import__'] = self.fs.import_
+        self.scope = {'__name__': '__main__', '__builtins__': scope_builtins}
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def read(self) -> bytes:
+        try:
+            return os.read(self.master, 1)
+        except OSError:
+            return b''
+
+    def write(self, data: bytes):
+        os.write(self.master, data)
+
+    def execute(self, code: bytes):
+        out = io.StringIO()
+        err = ''
+        try:
+            with redirect_stdout(out):
+                exec(code.decode(), self.scope)
+        except Exception:
+            err = traceback.format_exc()
+        self.write(out.getvalue().encode() + b'\x04' + err.encode() + b'\x04>')
+
+    def paste(self):
+        """Receive code in raw-paste mode and run it."""
+        self.write(b'R\x01' + self.window.to_bytes(2, 'little'))
+        code = bytearray()
+        allowed = self.window
+        while True:
+            b = self.read()
+            if not b or b == b'\x04':
+                break
+            code.extend(b)
+            allowed -= 1
+            if allowed:
+                continue
+            # bytes that are already waiting were sent before the host
+            # could have seen the next 0x01, so a real device would lose
+            # them
+            while select.select([self.master], [], [], 0)[0]:
+                b = self.read()
+                if b == b'\x04':
+                    break
+                self.overruns += 1
+            if b == b'\x04':
+                break
+            allowed = self.window
+            self.write(b'\x01')
+        self.write(b'\x04')
+        self.execute(bytes(code))
+
+    def run(self):
+        raw = False
+        code = bytearray()
+        while True:
+            b = self.read()
+            if not b:
+                return
+            if b == b'\x01':
+                raw = True
+                code = bytearray()
+                self.write(b'raw REPL; CTRL-B to exit\r\n>')
+            elif b == b'\x02':
+                raw = False
+                self.write(b'\r\nMicroPython emulator\r\n>>> ')
+            elif b == b'\x03':
+                code = bytearray()
+            elif not raw:
+                continue
+            elif b == b'\x05' and not code:
+                self.read(), self.read()
+                if self.raw_paste:
+                    self.paste()
+                else:
+                    self.write(b'R\x00')
+            elif b == b'\x04':
+                self.write(b'OK')
+                self.execute(bytes(code))
+                code = bytearray()
+            else:
+                code.extend(b)
+
+    def close(self):
+        os.close(self.slave)
+        os.close(self.master)
+        self.root.cleanup()
+
+
+def usage():
+    """Tool usage help text."""
+    print(f'Usage: python {argv[0]} {{port|--emulate}} /path/to/file [target] [--minify] [--compress] [--baud 115200]')
+    print('       Installs the file on the device at the serial port through the raw REPL')
+    print('       The target is the path on the device; default is the file name')
+    print('       The --minify and --compress flags work as in make_pastable.py')
+    print('       The --emulate flag uploads to a local pty stand-in for a device instead;')
+    print('       it writes to a temporary directory that is deleted afterwards')
+
+
+if __name__ == '__main__':
+    minified = '--minify' in argv
+    compressed = '--compress' in argv
+    baud = 115200
+    if '--baud' in argv:
+        i = argv.index('--baud')
+        baud = int(argv[i+1]) if len(argv) > i + 1 else baud
+        argv = argv[:i] + argv[i+2:]
+    argv = [a for a in argv if a not in ('--minify', '--compress')]
+    if len(argv) < 3:
+        usage()
+        sys.exit(1)
+    emulator = Emulator() if argv[1] == '--emulate' else None
+    port = emulator.path if emulator else argv[1]
+    target = argv[3] if len(argv) > 3 else None
+    began = time()
+    size = upload(port, argv[2], target, baud, minified, compressed)
+    print(f'Wrote {size} bytes to {target or argv[2].split("/")[-1]} in {time() - began:.1f} s; CRC32 verified')
+    if emulator:
+        print(f'Emulator overruns: {emulator.overruns}')
+        emulator.close()